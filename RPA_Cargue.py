@@ -20,6 +20,8 @@ from crm_navigation import (
     click_campaign_group_by_text,
     select_primefaces_option_by_text,
 )
+from predictivo_huellas import record_csv
+from predictivo_validacion import validate_files
 
 # ===================== CONFIGURACIÓN =====================
 load_dotenv()
@@ -58,6 +60,14 @@ def append_log(tipo: str, archivo: str, status: str, detalle: str):
         detalle = (detalle or "").replace("\n", " ").replace(";", ",")
         f.write(f"{ts};{tipo};{archivo};{status};{detalle}\n")
 
+def contar_filas(ruta: str) -> int:
+    """Filas de datos de un CSV (sin header)."""
+    try:
+        with open(ruta, "rb") as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    except OSError:
+        return 0
+
 def has_files_in_dir(directory: str) -> bool:
     full = os.path.join(os.getcwd(), directory)
     if not os.path.exists(full):
@@ -274,6 +284,9 @@ def cargar_archivos_secuencial(driver, tipo: str, rutas: list):
         nombre = os.path.basename(ruta)
         print(f"[{tipo}] ({idx}/{len(rutas)}) Cargando: {nombre}")
 
+        # filas y duración por archivo: predictivo_lotes ajusta el tamaño de lote con este historial
+        filas = contar_filas(ruta)
+        t0 = time.time()
         try:
             # a veces el input queda “bloqueado” hasta abrir el widget
             click_if_present(driver, By.XPATH, '//*[@id="mainForm:somConfigCagues"]/div[3]/span', timeout=2, desc="Abrir widget de estructura")
@@ -282,7 +295,15 @@ def cargar_archivos_secuencial(driver, tipo: str, rutas: list):
             append_log(tipo, nombre, "ENVIADO", f"clicked_upload_button={clicked}")
 
             status, detalle = wait_upload_finished(driver, timeout=TIMEOUT_CARGUE_SEGUNDOS)
-            append_log(tipo, nombre, status, detalle)
+            append_log(tipo, nombre, status, f"{detalle} | filas={filas} segundos={time.time() - t0:.1f}")
+
+            # registrar huellas de las filas cargadas (main_predictivo las omite en re-ejecuciones)
+            if tipo == "PREDICTIVO" and status == "OK":
+                try:
+                    n = record_csv(ruta)
+                    append_log(tipo, nombre, "INFO", f"Huellas registradas: {n}")
+                except Exception as e:
+                    append_log(tipo, nombre, "WARN", f"No se pudieron registrar huellas: {e}")
 
             # borrar archivo al finalizar (igual que tu lógica)
             try:
@@ -293,10 +314,28 @@ def cargar_archivos_secuencial(driver, tipo: str, rutas: list):
             time.sleep(PAUSA_ENTRE_ARCHIVOS)
 
         except Exception as e:
-            append_log(tipo, nombre, "ERROR", f"Falló cargue: {e}")
+            append_log(tipo, nombre, "ERROR", f"Falló cargue: {e} | filas={filas} segundos={time.time() - t0:.1f}")
             print(f"[WARN] {tipo}: error cargando {nombre}: {e}")
             # seguimos con el siguiente archivo
 
+# ===================== VALIDACIÓN PREVIA =====================
+# Los archivos Predictivo que no pasan la validación (header del template,
+# teléfono, CEDULA, FECHA GESTION) no se suben. Si no queda nada por cargar
+# no se abre el navegador.
+rutas_pred = get_files_flexible(CARPETA_PRED_LOTES, CARPETA_PREDICTIVO)
+reportes_pred = validate_files(rutas_pred)
+rutas_pred_invalidas = [r for r, rep in zip(rutas_pred, reportes_pred) if not rep["ok"]]
+for ruta, reporte in zip(rutas_pred, reportes_pred):
+    if not reporte["ok"]:
+        reglas = ", ".join(e["regla"] for e in reporte["errores"])
+        append_log("PREDICTIVO", os.path.basename(ruta), "ERROR", f"Validación fallida: {reglas}")
+rutas_pred = [r for r, rep in zip(rutas_pred, reportes_pred) if rep["ok"]]
+
+if rutas_pred_invalidas and not rutas_pred and not get_files_flexible(CARPETA_SMS_LOTES, CARPETA_SMS):
+    print(f"ERROR: {len(rutas_pred_invalidas)} archivo(s) Predictivo no pasan la validación "
+          f"(ver Logs/validacion). No se abre el navegador.")
+    sys.exit(1)
+
 # ===================== DRIVER =====================
 options = Options()
 options.add_experimental_option("detach", True)
@@ -347,7 +386,6 @@ try:
     select_primefaces_option_by_text(driver, "Seleccione estructura", "SMS")
 
     # ===================== 1) CARGAR PREDICTIVO (POR LOTES) =====================
-    rutas_pred = get_files_flexible(CARPETA_PRED_LOTES, CARPETA_PREDICTIVO)
     tiene_pred = bool(rutas_pred)
 
     if tiene_pred:
@@ -384,3 +422,7 @@ except Exception as e:
     sys.exit(1)
 finally:
     driver.quit()
+
+if rutas_pred_invalidas:
+    print(f"ERROR: {len(rutas_pred_invalidas)} archivo(s) Predictivo no se cargaron por validación fallida.")
+    sys.exit(1)
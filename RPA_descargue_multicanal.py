@@ -1,5 +1,6 @@
 import os
 import time
+from pathlib import Path
 import pyotp
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
@@ -10,6 +11,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 from dotenv import load_dotenv
 from crm_navigation import click_by_visible_text, click_campaign_detail_arrow, click_campaign_group_by_text
+from predictivo_multicanal import build_index
  
 # ===================== CONFIGURACIÓN =====================
 load_dotenv()
@@ -231,3 +233,11 @@ try:
 finally:
     driver.quit()
     print("Proceso finalizado.")
+
+# ---------------- ÍNDICE MULTICANAL ----------------
+# El predictivo lee el map CEDULA -> NUMERO PRODUCTO del índice en vez de
+# re-parsear el CSV; si falla aquí, main_predictivo lo construye en su paso
+try:
+    build_index(Path(downloaded_path))
+except Exception as e:
+    print(f"⚠️ No se pudo construir el índice Multicanal: {e}")
@@ -0,0 +1,102 @@
+"""
+Backfill del predictivo para días que no se procesaron (festivos, caídas del CRM).
+
+Cada día del rango se procesa en un proceso worker con su propia ventana de
+campaign_3 y su propia salida aislada:
+    Predictivo/backfill/<día>/cargue_predictivo_<día>.csv   (un CSV por portafolio, o lotes/ en esa carpeta)
+    Predictivo/backfill/<día>/backfill.log                  (salida del pipeline de ese día)
+
+Las llamadas a la API de Wolkvox se limitan con un semáforo compartido entre
+procesos (--max-api), independiente del número de workers.
+
+Uso:
+    python backfill_predictivo.py 2026-10-01 2026-10-05
+    python backfill_predictivo.py 2026-10-01 2026-10-05 --workers 4 --max-api 2
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+
+import main_predictivo as mp
+import predictivo_wolkvox
+
+BACKFILL_WORKERS   = int(os.getenv("PREDICTIVO_BACKFILL_WORKERS", "4") or 4)
+API_MAX_CONCURRENT = int(os.getenv("WOLKVOX_MAX_CONCURRENT", "2") or 2)
+
+# ========================= Worker =========================
+
+# Semáforo de llamadas a la API, heredado por cada worker en el initializer
+_API_SLOTS = None
+
+def _init_worker(api_slots):
+    global _API_SLOTS
+    _API_SLOTS = api_slots
+    # el paralelismo del backfill es por día: el transform y las ventanas de
+    # campaign_3 de cada día van en serie (--max-api sigue siendo el tope de llamadas)
+    mp.TRANSFORM_WORKERS = 0
+    predictivo_wolkvox.SHARD_WORKERS = 1
+
+def _fetch_limited(date_ini: str, date_end: str, opt1s: list):
+    with _API_SLOTS:
+        return mp.fetch_campaign3(date_ini, date_end, opt1s)
+
+def backfill_day(day: date) -> tuple:
+    """Procesa un día completo; retorna (día, filas generadas, segundos)."""
+    t0 = time.perf_counter()
+    date_ini, date_end = mp.compute_day_range_bogota(day)
+    day_dir = mp.backfill_output_file(day).parent
+    day_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(day_dir / "backfill.log", "w", encoding="utf-8") as log, redirect_stdout(log):
+        print(f"Backfill {day}: {date_ini} -> {date_end}")
+        n_rows = mp.run_predictivo(lambda opt1s: _fetch_limited(date_ini, date_end, opt1s), day, output_dir=day_dir)
+    return day, n_rows, time.perf_counter() - t0
+
+# ========================= CLI =========================
+
+def day_range(start: date, end: date) -> list:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill del predictivo por rango de días")
+    parser.add_argument("desde", type=date.fromisoformat, help="primer día (YYYY-MM-DD)")
+    parser.add_argument("hasta", type=date.fromisoformat, help="último día (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="procesos en paralelo")
+    parser.add_argument("--max-api", type=int, default=API_MAX_CONCURRENT,
+                        help="llamadas simultáneas máximas a la API de Wolkvox")
+    args = parser.parse_args()
+
+    days = day_range(args.desde, args.hasta)
+    if not days:
+        print("Rango vacío: 'desde' es posterior a 'hasta'.")
+        return 2
+
+    workers = max(1, min(args.workers, len(days)))
+    print(f"Backfill {args.desde} -> {args.hasta}: {len(days)} día(s), "
+          f"{workers} proceso(s), máx. {args.max_api} llamada(s) a la API")
+
+    api_slots = multiprocessing.BoundedSemaphore(max(1, args.max_api))
+    fallidos = []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(api_slots,)) as pool:
+        futures = {pool.submit(backfill_day, day): day for day in days}
+        for fut in as_completed(futures):
+            day = futures[fut]
+            try:
+                _, n_rows, secs = fut.result()
+                print(f"  {day}: OK, {n_rows} fila(s) en {secs:.1f} s -> {mp.backfill_output_file(day).parent}")
+            except Exception as e:
+                fallidos.append(day)
+                print(f"  {day}: ERROR {e}", file=sys.stderr)
+
+    print(f"Backfill terminado en {time.perf_counter() - t0:.1f} s "
+          f"({len(days) - len(fallidos)} OK, {len(fallidos)} con error)")
+    return 2 if fallidos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,824 @@
+"""
+Benchmarks del pipeline predictivo sobre un día sintético de campaign_3.
+
+Uso:
+    python benchmark_predictivo.py normalize --rows 500000
+    python benchmark_predictivo.py dates --rows 500000
+    python benchmark_predictivo.py mensaje --rows 500000
+    python benchmark_predictivo.py stream --rows 500000
+    python benchmark_predictivo.py parallel --rows 500000
+    python benchmark_predictivo.py memory --rows 500000      # exige MEMORY_MIN_DROP de pico total (mín. 100k filas)
+    python benchmark_predictivo.py schema --rows 500000
+    python benchmark_predictivo.py lookup --rows 500000
+    python benchmark_predictivo.py engines --rows 500000
+    python benchmark_predictivo.py portafolios --rows 500000
+    python benchmark_predictivo.py index --rows 500000
+    python benchmark_predictivo.py reader --rows 1000000     # export de ~300 MB
+    python benchmark_predictivo.py fetch --rows 500000       # JSON de campaign_3 servido en local
+    python benchmark_predictivo.py shards --rows 200000      # reports_manager.php falso con latencia y fallas
+    python benchmark_predictivo.py ingesta --rows 200000     # polls del día vs. fetch completo a las 7:05 PM
+    python benchmark_predictivo.py respuestas --rows 200000  # caché de respuestas: miss, hit y --no-cache
+    python benchmark_predictivo.py campanas --rows 200000    # campaign_id=all vs. solo las campañas de PROMOTORA
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import main_predictivo as mp
+import predictivo_campanas
+import predictivo_ingesta
+import predictivo_multicanal
+import predictivo_respuestas
+from predictivo_multicanal import MULTI_COL_ID, MULTI_COL_PROD, build_multicanal_map
+from predictivo_transform import (
+    normalize_phone_series,
+    clean_cedula_series,
+    parse_date_any,
+    parse_date_series,
+    map_unique,
+    parallel_build_cargue,
+    finalize_output,
+    resolve_output_columns,
+    id_as_text,
+    compact_id_series,
+)
+
+RESULTS = ["ANSWER", "ANSWER-MACHINE", "BUSY", "CONGESTION", "FAILED", "NO-ANSWER"]
+PROMOTORA_OPT1S = [mp.PORTAFOLIO_PROMOTORA["opt1"]]  # filtro de portafolios de los benches
+
+# ========================= Datos sintéticos =========================
+
+def synthetic_campaign(rows: int, seed: int = 7) -> pd.DataFrame:
+    """
+    Genera registros con la forma de campaign_3: teléfonos con prefijos
+    957/9, cédulas con ".0" y espacios, y fechas en el formato de la API.
+    """
+    rng = np.random.default_rng(seed)
+    base_phone = rng.integers(3000000000, 3509999999, size=rows).astype(str)
+    prefix = rng.choice(["", "9", "957", "957 ", "1"], size=rows)
+    cedula = rng.integers(10000000, 1100000000, size=rows).astype(str)
+    cedula_fmt = rng.choice(["", ".0", " "], size=rows)
+    seconds = rng.integers(0, 86400, size=rows)
+    dates = (pd.Timestamp("2026-10-16") + pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%d %H:%M:%S")
+
+    return pd.DataFrame({
+        "campaign_id": rng.integers(1, 40, size=rows).astype(str),
+        "customer_id": np.char.add(cedula, cedula_fmt),
+        "telephone": np.char.add(prefix, base_phone),
+        "result": rng.choice(RESULTS, size=rows),
+        "date": dates,
+        "opt1": rng.choice(["PROMOTORA", "OTRA"], size=rows, p=[0.8, 0.2]),
+        "conn_id": np.arange(rows).astype(str),
+    })
+
+def synthetic_multicanal_map(df_campaign: pd.DataFrame, rows: int = 100_000, seed: int = 11) -> pd.DataFrame:
+    """Multicanal con parte de las cédulas de df_campaign (y duplicados)."""
+    rng = np.random.default_rng(seed)
+    df_multi = pd.DataFrame({
+        MULTI_COL_ID: rng.choice(df_campaign["customer_id"].to_numpy(), size=rows),
+        MULTI_COL_PROD: rng.integers(1, 10**9, size=rows).astype(str),
+    })
+    return build_multicanal_map(df_multi)
+
+def _text_multicanal_map(multicanal_map: pd.DataFrame) -> pd.DataFrame:
+    """
+    Multicanal map en el formato anterior: columnas CEDULA y NUMERO PRODUCTO
+    como texto object (dtype explícito: en pandas 3 el texto se infiere como
+    str respaldado por Arrow).
+    """
+    return pd.DataFrame({
+        "CEDULA": id_as_text(multicanal_map.index.to_series()).to_numpy(dtype=object),
+        "NUMERO PRODUCTO": id_as_text(multicanal_map["NUMERO PRODUCTO"]).to_numpy(dtype=object),
+    }, dtype=object)
+
+def _timeit(fn, *args):
+    t0 = time.perf_counter()
+    res = fn(*args)
+    return res, time.perf_counter() - t0
+
+def _report(label: str, rows: int, secs: float):
+    print(f"{label:<28} {secs:8.3f} s  {rows / secs:>14,.0f} filas/s")
+
+# ========================= Referencias escalares =========================
+# Lógica fila a fila que reemplazaron los kernels de predictivo_transform;
+# bench_normalize exige que los kernels den exactamente lo mismo.
+
+def normalize_phone(x):
+    if pd.isna(x):
+        return None
+
+    # Extraer solo dígitos
+    digits = ''.join(ch for ch in str(x) if ch.isdigit())
+    if not digits:
+        return None
+
+    # Casos de prefijos conocidos
+    if digits.startswith("957"):
+        digits = digits[3:]
+    elif digits.startswith("9"):
+        digits = digits[1:]
+
+    # Validar que quede un celular colombiano válido
+    if len(digits) != 10 or not digits.startswith("3"):
+        return None
+
+    try:
+        return int(digits)
+    except Exception:
+        return None
+
+def clean_cedula_value(x) -> str:
+    s = "" if pd.isna(x) else str(x).strip()
+    s = re.sub(r"\.0$", "", s)
+    s = s.replace(" ", "")
+    return s
+
+# ========================= Benchmarks =========================
+
+def bench_normalize(rows: int):
+    df = synthetic_campaign(rows)
+
+    phone_apply, t_pa = _timeit(lambda s: s.apply(normalize_phone), df["telephone"])
+    phone_vec, t_pv = _timeit(normalize_phone_series, df["telephone"])
+    ced_apply, t_ca = _timeit(lambda s: s.apply(clean_cedula_value), df["customer_id"])
+    ced_vec, t_cv = _timeit(clean_cedula_series, df["customer_id"])
+
+    assert phone_vec.equals(phone_apply.astype("Int64")), "normalize_phone_series difiere de normalize_phone"
+    assert ced_vec.tolist() == ced_apply.tolist(), "clean_cedula_series difiere de clean_cedula_value"
+
+    print(f"[BENCH] normalize ({rows:,} filas)")
+    _report("telefono apply", rows, t_pa)
+    _report("telefono vectorizado", rows, t_pv)
+    _report("cedula apply", rows, t_ca)
+    _report("cedula vectorizado", rows, t_cv)
+
+def bench_dates(rows: int):
+    df = synthetic_campaign(rows)
+    # 1% de filas en otro formato para ejercitar la ruta lenta
+    df.loc[::100, "date"] = "16/10/2026 08:30:00"
+
+    dt_apply, t_a = _timeit(lambda s: s.apply(parse_date_any), df["date"])
+    (dt_vec, n_fallback), t_v = _timeit(parse_date_series, df["date"])
+
+    fmt = "%d/%m/%Y %H:%M:%S"
+    assert dt_vec.dt.strftime(fmt).equals(dt_apply.dt.strftime(fmt)), "parse_date_series difiere de parse_date_any"
+
+    print(f"[BENCH] dates ({rows:,} filas, {n_fallback:,} por ruta lenta)")
+    _report("fecha apply", rows, t_a)
+    _report("fecha vectorizado", rows, t_v)
+
+def bench_mensaje(rows: int):
+    df = synthetic_campaign(rows)
+    prefix = "llamada predictiva resultado: "
+
+    msg_apply, t_a = _timeit(lambda s: (prefix + s).apply(mp.sanitize_sms_text), df["result"])
+    msg_cat, t_c = _timeit(map_unique, df["result"], lambda r: mp.sanitize_sms_text(prefix + r))
+
+    assert msg_cat.astype(str).equals(msg_apply.astype(str)), "map_unique difiere del apply fila a fila"
+    obj_mb = msg_apply.astype(object).memory_usage(deep=True) / 1e6
+    cat_mb = msg_cat.memory_usage(deep=True) / 1e6
+
+    print(f"[BENCH] mensaje ({rows:,} filas, {msg_cat.cat.categories.size} valores distintos)")
+    _report("mensaje apply", rows, t_a)
+    _report("mensaje categorico", rows, t_c)
+    print(f"memoria: object {obj_mb:.1f} MB vs categorical {cat_mb:.1f} MB")
+
+def _traced(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn(*args)
+    secs = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, secs, peak / 1e6
+
+def bench_stream(rows: int, chunk_rows: int = 50_000):
+    mp.DEDUP_ENABLED = False  # no abrir el registro de huellas de producción (Predictivo/.huellas)
+    df = synthetic_campaign(rows)
+    multicanal_map = synthetic_multicanal_map(df)
+    records = df.to_dict("records")
+    del df
+
+    def full_path(out_path):
+        df_full = mp.filter_portafolios(pd.DataFrame(records), PROMOTORA_OPT1S)
+        out = mp.build_cargue_from_df(df_full, mp.TEMPLATE_PATH, multicanal_map, verbose=False)
+        out.to_csv(out_path, index=False, encoding="utf-8", sep=";")
+
+    def stream_path(out_path):
+        job = {**mp.PORTAFOLIO_PROMOTORA, "multicanal_map": multicanal_map, "output_file": out_path}
+        mp.write_cargue_streaming(records, mp.TEMPLATE_PATH, [job], chunk_rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_csv, stream_csv = Path(tmp) / "full.csv", Path(tmp) / "stream.csv"
+        _, t_full, peak_full = _traced(full_path, full_csv)
+        _, t_stream, peak_stream = _traced(stream_path, stream_csv)
+        identical = full_csv.read_bytes() == stream_csv.read_bytes()
+
+    assert identical, "el CSV en streaming difiere del CSV completo"
+    print(f"[BENCH] stream ({rows:,} registros, bloques de {chunk_rows:,}) -> CSV idéntico byte a byte")
+    print(f"completo   {t_full:8.3f} s  pico transform {peak_full:8.1f} MB")
+    print(f"streaming  {t_stream:8.3f} s  pico transform {peak_stream:8.1f} MB")
+
+def bench_parallel(rows: int):
+    df = mp.filter_portafolios(synthetic_campaign(rows), PROMOTORA_OPT1S)
+    multicanal_map = synthetic_multicanal_map(df)
+
+    print(f"[BENCH] parallel ({len(df):,} filas PROMOTORA)")
+    reference = None
+    for workers in (1, 2, 4, 8):
+        out, secs = _timeit(parallel_build_cargue, mp.build_cargue_from_df, df, mp.TEMPLATE_PATH,
+                            multicanal_map, workers)
+        csv = out.to_csv(index=False, sep=";")
+        if reference is None:
+            reference = csv
+        assert csv == reference, f"salida con {workers} workers difiere de la serie"
+        _report(f"{workers} worker(s)", len(df), secs)
+
+def _copying_pipeline(df_day: pd.DataFrame, text_map: pd.DataFrame):
+    """
+    Referencia con el patrón de copias anterior (rename().copy(), filtro con
+    .copy(), merge del frame completo, dropna().copy() y df.copy() para el log)
+    usando los mismos kernels, para aislar el costo de las copias.
+    """
+    df = df_day.copy()
+    mp.ensure_cols(df, ["opt1", "telephone", "result", "date", "customer_id"])
+    df = df[df["opt1"].astype(str).str.upper().eq("PROMOTORA")].copy()
+
+    work = df.rename(columns={"customer_id": "CUSTOMER_ID", "telephone": "TELEPHONE",
+                              "result": "RESULT", "date": "DATE"}).copy()
+    work["RESULT"] = work["RESULT"].astype(str)
+    work = work[~work["RESULT"].str.upper().eq("ANSWER")].copy()
+    work["NUM_TELEPHONE_CLEAN"] = normalize_phone_series(work["TELEPHONE"])
+    work["MENSAJE_TMP"] = map_unique(work["RESULT"], lambda r: mp.sanitize_sms_text("llamada predictiva resultado: " + r))
+    work["FECHA_GESTION_FMT"] = parse_date_series(work["DATE"])[0].dt.strftime("%d/%m/%Y %H:%M:%S")
+    work["CEDULA_JOIN"] = clean_cedula_series(work["CUSTOMER_ID"])
+
+    joined = work.merge(text_map, left_on="CEDULA_JOIN", right_on="CEDULA", how="left")
+    joined["NUMERO PRODUCTO"] = joined["NUMERO PRODUCTO"].fillna("").astype(str).str.strip()
+    out = pd.DataFrame({
+        "CEDULA": joined["CEDULA_JOIN"],
+        "NUMERO TELEFONO": joined["NUM_TELEPHONE_CLEAN"],
+        "MENSAJE": joined["MENSAJE_TMP"],
+        "FECHA GESTION": joined["FECHA_GESTION_FMT"],
+        "NUMERO PRODUCTO": joined["NUMERO PRODUCTO"],
+    }).dropna(subset=["CEDULA", "NUMERO TELEFONO"]).copy()
+    out = finalize_output(dict(out.items()), out.index, resolve_output_columns(mp.TEMPLATE_PATH, mp.FORMATO_COLUMNS))
+
+    df_log = df.copy()
+    df_log["result"] = df_log["result"].astype(str)
+    df_log = df_log[~df_log["result"].str.upper().eq("ANSWER")]
+    return out, df_log["result"].value_counts()
+
+def _current_pipeline(df_day: pd.DataFrame, multicanal_map: pd.DataFrame):
+    df = mp.filter_portafolios(df_day.copy(), PROMOTORA_OPT1S)
+    out = mp.build_cargue_from_df(df, mp.TEMPLATE_PATH, multicanal_map, verbose=False)
+    return out, mp.result_counts(df)
+
+def _memory_run(pipeline: str, rows: int) -> tuple:
+    """
+    Corre un pipeline en un proceso propio y mide el pico de tracemalloc
+    (Python / NumPy) y el del pool de memoria de Arrow: con pandas >= 3 las
+    columnas de texto viven en buffers de Arrow que tracemalloc no ve, y el
+    máximo del pool no se puede reiniciar entre corridas.
+    """
+    try:
+        import pyarrow as pa
+        pool = pa.default_memory_pool()
+    except ImportError:
+        pool = None
+    df_day = synthetic_campaign(rows)
+    multicanal_map = synthetic_multicanal_map(df_day)
+    if pipeline == "copias":
+        fn, args = _copying_pipeline, (df_day, _text_multicanal_map(multicanal_map))
+    else:
+        fn, args = _current_pipeline, (df_day, multicanal_map)
+    arrow_base = pool.bytes_allocated() if pool else 0
+    (out, _), secs, peak = _traced(fn, *args)
+    peak_arrow = (pool.max_memory() - arrow_base) / 1e6 if pool else None
+    cols = ["CEDULA", "NUMERO TELEFONO", "MENSAJE", "FECHA GESTION", "NUMERO PRODUCTO"]
+    return out[cols].to_csv(index=False), secs, peak, peak_arrow
+
+# bench_memory: filas mínimas para el chequeo (con menos, el pico lo ponen los bloques
+# de los kernels, iguales en los dos pipelines) y baja mínima del pico total exigida
+MEMORY_CHECK_ROWS = 100_000
+MEMORY_MIN_DROP = 0.25
+
+def bench_memory(rows: int):
+    if rows < MEMORY_CHECK_ROWS:
+        print(f"memory: {rows:,} filas no alcanzan a mostrar las copias; se usan {MEMORY_CHECK_ROWS:,}")
+        rows = MEMORY_CHECK_ROWS
+    results = {}
+    for pipeline in ("copias", "actual"):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results[pipeline] = pool.submit(_memory_run, pipeline, rows).result()
+    (csv_old, t_old, peak_old, arrow_old), (csv_new, t_new, peak_new, arrow_new) = results.values()
+    assert csv_old == csv_new, "las salidas difieren"
+
+    print(f"[BENCH] memory ({rows:,} registros)")
+    arrow = lambda mb: "" if mb is None else f"  Arrow {mb:8.1f} MB"
+    print(f"con copias     {t_old:8.3f} s  pico {peak_old:8.1f} MB{arrow(arrow_old)}")
+    print(f"sin copias     {t_new:8.3f} s  pico {peak_new:8.1f} MB{arrow(arrow_new)}"
+          f"  ({1 - peak_new / peak_old:.0%} menos" + ("" if arrow_new is None else
+          f"; Arrow {1 - arrow_new / arrow_old:.0%} menos") + ")")
+    # pico total: tracemalloc (Python / NumPy) + pool de Arrow (texto con pandas >= 3)
+    total_old, total_new = peak_old + (arrow_old or 0), peak_new + (arrow_new or 0)
+    drop = 1 - total_new / total_old
+    print(f"pico total     {total_old:8.1f} MB -> {total_new:8.1f} MB ({drop:.0%} menos)")
+    assert drop >= MEMORY_MIN_DROP, (f"el pico total baja {drop:.0%}, se esperaba al menos "
+                                     f"{MEMORY_MIN_DROP:.0%}")
+
+def bench_schema(rows: int):
+    df = mp.filter_portafolios(synthetic_campaign(rows), PROMOTORA_OPT1S)
+    multicanal_map = synthetic_multicanal_map(df, rows=rows)
+    out = mp.build_cargue_from_df(df, mp.TEMPLATE_PATH, multicanal_map, verbose=False)
+
+    def mb(frame):
+        # el índice como columna: memory_usage del índice suma la hashtable si ya hubo lookups
+        if not isinstance(frame.index, pd.RangeIndex):
+            frame = frame.reset_index()
+        return frame.memory_usage(index=False, deep=True).sum() / 1e6
+
+    def as_object(frame):
+        return pd.DataFrame({c: frame[c].astype(str).to_numpy(dtype=object) for c in frame.columns}, dtype=object)
+
+    sizes = {
+        "multicanal map": (mb(_text_multicanal_map(multicanal_map)), mb(multicanal_map)),
+        "salida cargue": (mb(as_object(out)), mb(out)),
+    }
+    print(f"[BENCH] schema ({len(df):,} filas PROMOTORA, Multicanal {len(multicanal_map):,})")
+    for label, (text_mb, compact_mb) in sizes.items():
+        print(f"{label:<15} object {text_mb:8.1f} MB  compacto {compact_mb:8.1f} MB")
+        assert compact_mb < text_mb, f"{label}: el formato compacto no ocupa menos que object"
+
+def bench_lookup(rows: int):
+    df = mp.filter_portafolios(synthetic_campaign(rows), PROMOTORA_OPT1S)
+    multicanal_map = synthetic_multicanal_map(df, rows=rows)
+    text_map = _text_multicanal_map(multicanal_map)
+    cedula = compact_id_series(clean_cedula_series(df["customer_id"]))
+    cedula_text = id_as_text(cedula)
+
+    def merge_lookup():
+        joined = cedula_text.to_frame("CEDULA_JOIN").merge(text_map, left_on="CEDULA_JOIN",
+                                                           right_on="CEDULA", how="left")
+        return joined["NUMERO PRODUCTO"].fillna("").astype(str).str.strip()
+
+    by_merge, t_m = _timeit(merge_lookup)
+    mp.lookup_numero_producto(cedula.iloc[:1], multicanal_map)  # construye la tabla hash del índice
+    by_index, t_i = _timeit(mp.lookup_numero_producto, cedula, multicanal_map)
+    assert id_as_text(by_index).tolist() == by_merge.tolist(), "get_indexer difiere del merge"
+
+    print(f"[BENCH] lookup ({len(df):,} filas, Multicanal {len(multicanal_map):,})")
+    _report("merge", len(df), t_m)
+    _report("get_indexer", len(df), t_i)
+
+def bench_engines(rows: int):
+    df = mp.filter_portafolios(synthetic_campaign(rows), PROMOTORA_OPT1S)
+    df.loc[df.index[::173], "result"] = None
+    multicanal_map = synthetic_multicanal_map(df, rows=rows)
+
+    outs = {}
+    print(f"[BENCH] engines ({len(df):,} filas)")
+    for engine, build_fn in mp.TRANSFORM_ENGINES.items():
+        out, secs = _timeit(build_fn, df, mp.TEMPLATE_PATH, multicanal_map, False)
+        outs[engine] = out.to_csv(sep=";", index=False, encoding="utf-8-sig")
+        _report(engine, len(df), secs)
+    assert outs["arrow"] == outs["pandas"], "el motor arrow no produce el mismo CSV que pandas"
+
+def bench_portafolios(rows: int, n_portafolios: int = 6):
+    df = synthetic_campaign(rows)
+    rng = np.random.default_rng(5)
+    opt1s = [f"PORTAFOLIO{i}" for i in range(n_portafolios)]
+    df["opt1"] = rng.choice(opt1s + ["otra", None], size=rows)
+    opt1s = [o.upper() for o in opt1s]
+
+    def filter_each():
+        return {o: df[df["opt1"].astype(str).str.upper().eq(o)] for o in opt1s}
+
+    print(f"[BENCH] portafolios ({rows:,} registros, {n_portafolios} portafolios)")
+    by_filter, t_filter = _timeit(filter_each)
+    by_group, t_group = _timeit(mp.split_portafolios, df, opt1s)
+    _report("un filtro por portafolio", rows, t_filter)
+    _report("groupby único", rows, t_group)
+    for o in opt1s:
+        pd.testing.assert_frame_equal(by_group[o], by_filter[o])
+
+def bench_index(rows: int):
+    df = synthetic_campaign(rows)
+    rng = np.random.default_rng(13)
+    df_multi = pd.DataFrame({
+        MULTI_COL_ID: rng.choice(df["customer_id"].to_numpy(), size=rows),
+        MULTI_COL_PROD: rng.integers(1, 10**9, size=rows).astype(str),
+        "Nombre": "CLIENTE",
+    })
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "multicanal.csv"
+        df_multi.to_csv(csv_path, sep=";", index=False, encoding="utf-8")
+        print(f"[BENCH] index (Multicanal de {rows:,} filas)")
+        built, secs = _timeit(predictivo_multicanal.build_index, csv_path)
+        _report("CSV -> map (+ índice)", rows, secs)
+        loaded, secs = _timeit(predictivo_multicanal.load_index, csv_path)
+        _report("índice Parquet -> map", rows, secs)
+    assert loaded is not None, "el índice no quedó vigente tras construirlo"
+    pd.testing.assert_frame_equal(loaded, built)
+
+def synthetic_multicanal_csv(path: Path, rows: int, encoding: str = "utf-8", seed: int = 17):
+    """Export del Multicanal con la forma del CRM: ~25 columnas, acentos en textos y ';' como separador."""
+    rng = np.random.default_rng(seed)
+    cedula = rng.integers(10_000_000, 1_100_000_000, size=rows).astype(str)
+    cols = {
+        "Tipo Identificación": rng.choice(["CC", "CE", "NIT"], size=rows),
+        MULTI_COL_ID: np.char.add(cedula, rng.choice(["", ".0", " "], size=rows)),
+        "Nombre Cliente": rng.choice(["JOSÉ PEÑA", "MARÍA GÓMEZ", "ANDRÉS MUÑOZ", "LUZ ÁNGELA DÍAZ"], size=rows),
+        MULTI_COL_PROD: rng.integers(1, 10**9, size=rows).astype(str),
+    }
+    for i in range(1, 22):
+        cols[f"Campo {i}"] = rng.choice([f"VALOR {i} {k}" for k in range(50)] + ["", "Bogotá D.C."], size=rows)
+    pd.DataFrame(cols).to_csv(path, sep=";", index=False, encoding=encoding)
+
+def _legacy_read_multicanal(path: Path) -> pd.DataFrame:
+    """Lector anterior: parser python, todas las columnas, UTF-8 y si falla relectura completa en latin-1."""
+    try:
+        return pd.read_csv(path, sep=";", dtype=str, encoding="utf-8", engine="python")
+    except UnicodeDecodeError:
+        return pd.read_csv(path, sep=";", dtype=str, encoding="latin-1", engine="python")
+
+def bench_reader(rows: int):
+    read = predictivo_multicanal.read_multicanal_csv
+    with tempfile.TemporaryDirectory() as tmp:
+        for encoding in ("utf-8", "latin-1"):
+            csv_path = Path(tmp) / f"multicanal_{encoding}.csv"
+            synthetic_multicanal_csv(csv_path, rows, encoding)
+            size_mb = csv_path.stat().st_size / 1e6
+            print(f"[BENCH] reader ({rows:,} filas, {size_mb:,.0f} MB, {encoding}, "
+                  f"codificación detectada: {predictivo_multicanal.sniff_encoding(csv_path)})")
+
+            expected, secs = _timeit(_legacy_read_multicanal, csv_path)
+            _report("python, todas las columnas", rows, secs)
+            expected = build_multicanal_map(expected)
+            for label, args in (("C, 2 columnas", ("c", False)),
+                                ("C + memory_map, 2 columnas", ("c", True)),
+                                ("pyarrow, 2 columnas", ("pyarrow", False))):
+                df, secs = _timeit(read, csv_path, *args)
+                _report(label, rows, secs)
+                pd.testing.assert_frame_equal(build_multicanal_map(df), expected)
+            csv_path.unlink()
+
+def synthetic_campaign_payload(path: Path, rows: int):
+    """Respuesta grabada de campaign_3: {"code", "message", "data": [...]} con los campos opt* y de cliente."""
+    df = synthetic_campaign(rows)
+    df["customer_name"] = "NOMBRE"
+    df["customer_last_name"] = "APELLIDO PÉREZ"
+    df["id_type"] = "CC"
+    for i in range(2, 13):
+        df[f"opt{i}"] = ""
+    df.loc[df.index[::97], "opt5"] = None
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"code": 200, "message": "ok", "data": [')
+        for start in range(0, rows, 50_000):
+            chunk = df.iloc[start:start + 50_000].to_dict("records")
+            f.write((", " if start else "") + ", ".join(json.dumps(r, ensure_ascii=False) for r in chunk))
+        f.write("]}")
+
+def _serve_file(path: Path) -> ThreadingHTTPServer:
+    """Servidor HTTP local que responde cualquier GET con el contenido de path."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(path.stat().st_size))
+            self.end_headers()
+            with open(path, "rb") as f:
+                while block := f.read(1 << 16):
+                    self.wfile.write(block)
+
+        def log_message(self, *args):
+            pass
+
+    return _start_server(Handler)
+
+def _start_server(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.setdefault("OP04_SERVER", "local")
+    os.environ.setdefault("OP04_TOKEN", "local")
+    mp.WOLKVOX_REPORTS_URL = f"http://127.0.0.1:{server.server_address[1]}/reports_manager.php"
+    return server
+
+def bench_fetch(rows: int):
+    opt1s = ["PROMOTORA"]
+    predictivo_respuestas.ENABLED = False  # se mide la lectura de la respuesta HTTP
+    with tempfile.TemporaryDirectory() as tmp:
+        payload = Path(tmp) / "campaign_3.json"
+        synthetic_campaign_payload(payload, rows)
+        multicanal_map = synthetic_multicanal_map(synthetic_campaign(rows))
+
+        server = _serve_file(payload)
+
+        def json_path():
+            return mp.filter_portafolios(pd.DataFrame(mp.fetch_campaign3_json("x", "y")), opt1s)
+
+        def stream_path():
+            return mp.filter_portafolios(mp.fetch_campaign3_frame("x", "y", opt1s), opt1s)
+
+        try:
+            print(f"[BENCH] fetch ({rows:,} registros, {payload.stat().st_size / 1e6:,.0f} MB de JSON)")
+            df_json, t_json, peak_json = _traced(json_path)
+            df_stream, t_stream, peak_stream = _traced(stream_path)
+        finally:
+            server.shutdown()
+
+    print(f"resp.json() + DataFrame   {t_json:8.3f} s  pico {peak_json:8.1f} MB  ({len(df_json):,} filas PROMOTORA)")
+    print(f"lectura incremental       {t_stream:8.3f} s  pico {peak_stream:8.1f} MB  ({len(df_stream):,} filas sin ANSWER)")
+    outs = [mp.build_cargue_from_df(df, mp.TEMPLATE_PATH, multicanal_map, verbose=False)
+              .to_csv(sep=";", index=False, encoding="utf-8") for df in (df_json, df_stream)]
+    assert outs[0] == outs[1], "el cargue desde la lectura incremental difiere del de resp.json()"
+    print("cargue idéntico byte a byte")
+
+def _fake_reports_manager(df_day: pd.DataFrame, secs_per_row: float, overlap: int):
+    """
+    Handler que imita reports_manager.php?api=campaign_3: responde los
+    registros con date dentro de [date_ini, date_end] (y del campaign_id
+    pedido, salvo all) con una latencia proporcional a las filas, más los
+    últimos overlap registros de la ventana anterior (conn_id repetidos). El
+    primer intento de algunas ventanas falla: HTTP 503, JSON cortado a la
+    mitad o una conexión que no responde dentro del timeout.
+    Handler.bytes_sent acumula los bytes respondidos.
+    """
+    dates = df_day["date"].to_numpy()
+    campaign_ids = df_day["campaign_id"].to_numpy()
+    attempts = {}
+    lock = threading.Lock()
+
+    def as_api_date(value: str) -> str:
+        return pd.Timestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = dict(q.split("=", 1) for q in self.path.split("?", 1)[1].split("&"))
+            ini, end = as_api_date(query["date_ini"]), as_api_date(query["date_end"])
+            cid = query.get("campaign_id", "all")
+            with lock:
+                n = attempts[ini, cid] = attempts.get((ini, cid), 0) + 1
+            lo, hi = np.searchsorted(dates, ini, "left"), np.searchsorted(dates, end, "right")
+            lo = max(0, lo - overlap)
+            window_rows = df_day.iloc[lo:hi]
+            if cid != "all":
+                window_rows = window_rows[campaign_ids[lo:hi] == cid]
+            rows = window_rows.to_dict("records")
+            time.sleep(len(rows) * secs_per_row)
+
+            window = int(query["date_ini"][8:10])
+            if n == 1 and window % 5 == 1:
+                self.send_error(503)
+                return
+            if n == 1 and window % 7 == 3:
+                time.sleep(mp.predictivo_wolkvox.TIMEOUT_S * 2)
+                return
+            body = json.dumps({"code": 200, "message": "ok", "data": rows}).encode()
+            if n == 1 and window % 7 == 5:
+                body = body[:len(body) // 2]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with lock:
+                Handler.bytes_sent += len(body)
+
+        bytes_sent = 0
+
+        def log_message(self, *args):
+            pass
+
+    return Handler, attempts
+
+def bench_shards(rows: int):
+    wolkvox = mp.predictivo_wolkvox
+    predictivo_respuestas.ENABLED = False  # cada corrida pide todas las ventanas a la API
+    predictivo_campanas.ENABLED = False
+    opt1s = ["PROMOTORA"]
+    df_day = synthetic_campaign(rows).sort_values("date", kind="stable", ignore_index=True)
+    multicanal_map = synthetic_multicanal_map(df_day)
+    date_ini, date_end = mp.compute_day_range_bogota(date(2026, 10, 16))
+    secs_per_row = 6.0 / rows  # día completo: ~6 s en el servidor
+
+    def fetch(minutes: int, workers: int, overlap: int, timeout_s: float) -> tuple:
+        handler, attempts = _fake_reports_manager(df_day, secs_per_row, overlap)
+        server = _start_server(handler)
+        wolkvox.SHARD_MINUTES, wolkvox.SHARD_WORKERS, wolkvox.TIMEOUT_S = minutes, workers, timeout_s
+        try:
+            df, secs = _timeit(mp.fetch_campaign3, date_ini, date_end, opt1s)
+        finally:
+            server.shutdown()
+        return df, secs, sum(attempts.values()) - len(attempts)
+
+    wolkvox.BACKOFF_S = 0.1
+    print(f"[BENCH] shards ({rows:,} registros; fallas inyectadas: 503, JSON cortado, timeout de 2 s)")
+    # referencia: el día completo en una llamada (la primera falla con 503 y se reintenta)
+    expected, t_single, _ = fetch(0, 1, 0, timeout_s=60)
+    _report("una llamada", rows, t_single)
+    for minutes, workers in ((60, 1), (60, 4), (60, 8), (30, 8)):
+        df, secs, retries = fetch(minutes, workers, overlap=3, timeout_s=2)
+        _report(f"{minutes} min x {workers} en paralelo", rows, secs)
+        print(f"{'':<28} {retries} reintento(s), {df.attrs['duplicados']} conn_id repetidos descartados")
+        pd.testing.assert_frame_equal(df, expected)
+
+    outs = [mp.build_cargue_from_df(d, mp.TEMPLATE_PATH, multicanal_map, verbose=False)
+              .to_csv(sep=";", index=False, encoding="utf-8") for d in (expected, df)]
+    assert outs[0] == outs[1], "el cargue por ventanas difiere del de una sola llamada"
+    print("cargue idéntico byte a byte")
+
+def bench_ingesta(rows: int):
+    wolkvox = mp.predictivo_wolkvox
+    predictivo_respuestas.ENABLED = False
+    predictivo_campanas.ENABLED = False
+    opt1s = ["PROMOTORA"]
+    day = date(2026, 10, 16)
+    df_day = synthetic_campaign(rows).sort_values("date", kind="stable", ignore_index=True)
+    df_day = df_day[df_day["date"] < "2026-10-16 19:05:00"]
+    multicanal_map = synthetic_multicanal_map(df_day)
+    fetch_window = partial(mp.fetch_campaign3, stream=True)
+    date_ini, date_end = mp.compute_day_range_bogota(day)
+
+    handler, attempts = _fake_reports_manager(df_day, 6.0 / rows, overlap=0)
+    server = _start_server(handler)
+    wolkvox.BACKOFF_S, wolkvox.TIMEOUT_S = 0.1, 2.0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            predictivo_ingesta.INGESTA_DIR = Path(tmp)
+            print(f"[BENCH] ingesta ({len(df_day):,} registros hasta las 19:05; un poll por hora)")
+            t_polls = 0.0
+            for hour in range(1, 20):
+                _, secs = _timeit(predictivo_ingesta.poll_once, day, opt1s, fetch_window, datetime(2026, 10, 16, hour))
+                t_polls += secs
+            stored, t_final = _timeit(predictivo_ingesta.catch_up, day, opt1s, fetch_window,
+                                      datetime(2026, 10, 16, 19, 5))
+            expected, t_full = _timeit(mp.fetch_campaign3, date_ini, date_end, opt1s)
+    finally:
+        server.shutdown()
+
+    _report("polls 01:00-19:00 (total)", len(df_day), t_polls)
+    _report("7:05 PM: último poll + local", len(df_day), t_final)
+    _report("7:05 PM: día completo", len(df_day), t_full)
+    pd.testing.assert_frame_equal(stored, expected)
+    outs = [mp.build_cargue_from_df(d, mp.TEMPLATE_PATH, multicanal_map, verbose=False)
+              .to_csv(sep=";", index=False, encoding="utf-8") for d in (stored, expected)]
+    assert outs[0] == outs[1], "el cargue desde el almacén difiere del de un fetch del día completo"
+    print("cargue idéntico byte a byte")
+
+def bench_respuestas(rows: int):
+    wolkvox = mp.predictivo_wolkvox
+    predictivo_campanas.ENABLED = False
+    opt1s = ["PROMOTORA"]
+    df_day = synthetic_campaign(rows).sort_values("date", kind="stable", ignore_index=True)
+    date_ini, date_end = mp.compute_day_range_bogota(date(2026, 10, 16))  # día cerrado: no expira
+
+    handler, attempts = _fake_reports_manager(df_day, 6.0 / rows, overlap=0)
+    server = _start_server(handler)
+    wolkvox.BACKOFF_S, wolkvox.TIMEOUT_S = 0.1, 2.0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            predictivo_respuestas.RESPUESTAS_DIR = Path(tmp)
+            print(f"[BENCH] respuestas ({rows:,} registros, 24 ventanas)")
+            runs = []
+            for label, refresh in (("miss (API + gzip)", False), ("hit", False), ("--no-cache", True)):
+                predictivo_respuestas.REFRESH = refresh
+                before = sum(attempts.values())
+                df, secs = _timeit(mp.fetch_campaign3, date_ini, date_end, opt1s)
+                _report(label, rows, secs)
+                print(f"{'':<28} {sum(attempts.values()) - before} llamada(s) a la API")
+                runs.append(df)
+            size_mb = sum(p.stat().st_size for p in Path(tmp).iterdir()) / 1e6
+
+            # respuestas del día bajadas con el día abierto (7:05 PM): el día ya cerró, pero no son
+            # definitivas y vencen por TTL; las que se vuelven a bajar ahora sí quedan definitivas
+            predictivo_respuestas.REFRESH = False
+            entries = list(Path(tmp).glob(f"*{predictivo_respuestas.SUFFIX}"))
+            open_day = datetime(2026, 10, 16, 19, 5, tzinfo=predictivo_respuestas.TZ).timestamp()
+            for p in entries:
+                os.utime(p, (open_day, open_day))
+            for label, expected in (("día abierto al bajar", len(entries)), ("re-descarga (hit)", 0)):
+                before = sum(attempts.values())
+                df, secs = _timeit(mp.fetch_campaign3, date_ini, date_end, opt1s)
+                calls = sum(attempts.values()) - before
+                _report(label, rows, secs)
+                print(f"{'':<28} {calls} llamada(s) a la API")
+                assert calls == expected, (label, calls, expected)
+                runs.append(df)
+    finally:
+        server.shutdown()
+        predictivo_respuestas.REFRESH = False
+
+    print(f"caché en disco: {size_mb:.1f} MB")
+    for df in runs[1:]:
+        pd.testing.assert_frame_equal(df, runs[0])
+        assert df.attrs["payload_fp"] == runs[0].attrs["payload_fp"]
+
+def bench_campanas(rows: int, promotora_share: float = 0.2):
+    wolkvox = mp.predictivo_wolkvox
+    predictivo_respuestas.ENABLED = False
+    opt1s = ["PROMOTORA"]
+    rng = np.random.default_rng(23)
+    df_day = synthetic_campaign(rows).sort_values("date", kind="stable", ignore_index=True)
+    # el tenant: PROMOTORA en las campañas 3 y 7, el resto de operaciones en 8-39
+    promotora = rng.random(rows) < promotora_share
+    df_day["opt1"] = np.where(promotora, "PROMOTORA", "OTRA")
+    df_day["campaign_id"] = np.where(promotora, rng.choice(["3", "7"], size=rows),
+                                     rng.integers(8, 40, size=rows).astype(str))
+    # campaña 11 de PROMOTORA con solo ANSWER: no llega al cargue, pero el mapa debe conservarla
+    answer_only = promotora & (rng.random(rows) < 0.05)
+    df_day.loc[answer_only, "campaign_id"] = "11"
+    df_day.loc[answer_only, "result"] = "ANSWER"
+    # reintentos en el mismo segundo (misma cédula, fecha y RESULT): la compactación los
+    # desempata por el orden de las filas, así que un cambio de orden cambia el cargue
+    dup = np.arange(0, rows - 1, 10)
+    for col in ("customer_id", "date", "result"):
+        df_day.loc[dup + 1, col] = df_day.loc[dup, col].to_numpy()
+    # el orden de la API no está documentado: dentro de cada segundo las filas llegan mezcladas
+    df_day = (df_day.assign(_r=rng.random(rows)).sort_values(["date", "_r"], kind="stable")
+                    .drop(columns="_r").reset_index(drop=True))
+    multicanal_map = synthetic_multicanal_map(df_day)
+    date_ini, date_end = mp.compute_day_range_bogota(date(2026, 10, 16))
+
+    wolkvox.BACKOFF_S, wolkvox.TIMEOUT_S = 0.1, 2.0
+    with tempfile.TemporaryDirectory() as tmp:
+        predictivo_campanas.CAMPAIGN_IDS_FILE = Path(tmp) / "campaign_ids.json"
+        print(f"[BENCH] campanas ({rows:,} registros, {promotora_share:.0%} PROMOTORA, 24 ventanas)")
+        runs = []
+        for label, refresh_h in (("sin mapa: all + aprende", 72), ("mapa vigente: 3, 7, 11", 72),
+                                 ("mapa vencido: all", 0)):
+            # servidor nuevo por corrida: las mismas fallas inyectadas en el primer intento
+            handler, attempts = _fake_reports_manager(df_day, 6.0 / rows, overlap=0)
+            server = _start_server(handler)
+            predictivo_campanas.REFRESH_HOURS = refresh_h
+            try:
+                df, secs = _timeit(mp.fetch_campaign3, date_ini, date_end, opt1s)
+            finally:
+                server.shutdown()
+            _report(label, rows, secs)
+            print(f"{'':<28} {sum(attempts.values())} llamada(s), {handler.bytes_sent / 1e6:.1f} MB de JSON")
+            runs.append(df)
+        mapping = predictivo_campanas.load_mapping()
+
+        # un día sin registros de la campaña 7 no la saca del mapa; a los EXPIRE_DAYS sin verse sí
+        seen_3 = pd.DataFrame({"opt1": ["PROMOTORA"], "campaign_id": ["3"]})
+        predictivo_campanas.learn_campaign_ids(seen_3, opt1s)
+        merged = list(predictivo_campanas.load_mapping()["PROMOTORA"]["campaign_ids"])
+        later = datetime.now(predictivo_campanas.TZ) + pd.Timedelta(days=predictivo_campanas.EXPIRE_DAYS + 1)
+        predictivo_campanas.learn_campaign_ids(seen_3, opt1s, now=later)
+        expired = list(predictivo_campanas.load_mapping()["PROMOTORA"]["campaign_ids"])
+
+    assert list(mapping["PROMOTORA"]["campaign_ids"]) == ["3", "7", "11"], mapping
+    assert merged == ["3", "7", "11"], merged
+    assert expired == ["3"], expired
+    for df in runs[1:]:
+        pd.testing.assert_frame_equal(df, runs[0])
+    mp.COMPACT_MODE = "cedula"  # el desempate de la compactación depende del orden de las filas
+    outs = [mp.compact_cargue(mp.build_cargue_from_df(d, mp.TEMPLATE_PATH, multicanal_map, verbose=False))
+              .to_csv(sep=";", index=False, encoding="utf-8") for d in runs]
+    assert outs[0] == outs[1] == outs[2], "el cargue por campaña difiere del de campaign_id=all"
+    print("mismos registros en el mismo orden y cargue compactado idéntico byte a byte")
+
+BENCHMARKS = {
+    "normalize": bench_normalize,
+    "dates": bench_dates,
+    "mensaje": bench_mensaje,
+    "stream": bench_stream,
+    "parallel": bench_parallel,
+    "memory": bench_memory,
+    "schema": bench_schema,
+    "lookup": bench_lookup,
+    "engines": bench_engines,
+    "portafolios": bench_portafolios,
+    "index": bench_index,
+    "reader": bench_reader,
+    "fetch": bench_fetch,
+    "shards": bench_shards,
+    "ingesta": bench_ingesta,
+    "respuestas": bench_respuestas,
+    "campanas": bench_campanas,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline predictivo")
+    parser.add_argument("bench", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    BENCHMARKS[args.bench](args.rows)
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,61 @@
+import argparse
 import os
 import sys
 import re
+import json
+import time
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
+from functools import partial
+from itertools import islice
 from zoneinfo import ZoneInfo
  
+import numpy as np
 import pandas as pd
 import requests
 from dotenv import load_dotenv
+
+from predictivo_transform import (
+    normalize_phone_series,
+    clean_cedula_series,
+    parse_date_series,
+    format_date_series,
+    map_unique,
+    constant_column,
+    read_template_columns,
+    resolve_output_columns,
+    finalize_output,
+    parallel_build_cargue,
+    lookup_numero_producto,
+    enable_copy_on_write,
+    compact_id_series,
+    compact_attempts,
+    timed,
+    print_stage_timings,
+)
+import predictivo_arrow
+from predictivo_cache import (
+    StageCache,
+    file_fingerprint,
+    content_fingerprint,
+    payload_fingerprint,
+)
+from predictivo_huellas import filter_unseen
+from predictivo_json import campaign_frame
+from predictivo_wolkvox import (
+    shard_windows, fetch_windows, merge_frames, merge_records, sort_frame, sort_records,
+)
+import predictivo_wolkvox
+import predictivo_ingesta
+import predictivo_respuestas
+import predictivo_campanas
+from predictivo_multicanal import load_or_build_index
+from predictivo_validacion import validate_files
+from predictivo_lotes import resolve_lote_rows, write_lotes, split_csv_file
+
+enable_copy_on_write()
  
 # ========================= Config/Constantes =========================
  
@@ -29,10 +76,64 @@ PROJECT_ROOT   = Path(__file__).resolve().parent
 TEMPLATE_PATH  = PROJECT_ROOT / "formatoArbolProducto.csv"
 PREDICTIVO_DIR = PROJECT_ROOT / "Predictivo"
 OUTPUT_FILE    = PREDICTIVO_DIR / f"cargue_predictivo_{datetime.now(ZoneInfo('America/Bogota')).date()}.csv"
+BACKFILL_DIR   = PREDICTIVO_DIR / "backfill"
+
+# Reporte campaign_3 de Wolkvox (campaign_id=all, o solo las campañas de los
+# portafolios si predictivo_campanas tiene un mapa vigente)
+WOLKVOX_REPORTS_URL = os.getenv("WOLKVOX_REPORTS_URL",
+                                "https://wv0026.wolkvox.com/api/v2/reports_manager.php").strip()
+# Lectura incremental del JSON (1 = activa): filtra opt1/RESULT mientras se
+# parsea y solo guarda los registros de los portafolios, columna por columna
+JSON_STREAM = os.getenv("PREDICTIVO_JSON_STREAM", "1").strip() != "0"
+JSON_CHUNK_BYTES = 1 << 20
  
 MULTICANAL_DIR = PROJECT_ROOT / "Multicanal"
-MULTI_COL_ID   = "Número Identificación"
-MULTI_COL_PROD = "Numero producto"
+
+# Portafolios del mismo tenant Wolkvox: el fetch de campaign_3 (campaign_id=all)
+# se hace una sola vez y se reparte por opt1. PREDICTIVO_PORTAFOLIOS apunta a un
+# JSON con la lista de portafolios; sin él solo se procesa PROMOTORA
+PORTAFOLIOS_FILE = os.getenv("PREDICTIVO_PORTAFOLIOS", "").strip()
+PORTAFOLIO_PROMOTORA = {
+    "opt1": "PROMOTORA",
+    "constantes": CONSTANTES,
+    "multicanal_dir": MULTICANAL_DIR,
+    "output_file": "Predictivo/cargue_predictivo_{fecha}.csv",
+}
+ 
+# Modo streaming: si > 0, los registros de la API se transforman y escriben
+# en bloques de este tamaño (memoria acotada por bloque, no por día)
+STREAM_CHUNK_ROWS = int(os.getenv("PREDICTIVO_CHUNK_ROWS", "0") or 0)
+ 
+# Transform en paralelo: número de procesos (0/1 = en serie)
+TRANSFORM_WORKERS = int(os.getenv("PREDICTIVO_WORKERS", "0") or 0)
+
+# Motor del transform: "pandas" (por defecto) o "arrow" (requiere pyarrow)
+TRANSFORM_ENGINE = os.getenv("PREDICTIVO_ENGINE", "pandas").strip().lower() or "pandas"
+
+# Compactación de intentos: "" (desactivada), "cedula" o "cedula_telefono".
+# Deja la gestión más reciente por llave; en empate de FECHA GESTION gana el
+# RESULT que aparezca primero en PREDICTIVO_RESULT_PRIORITY
+COMPACT_MODE = os.getenv("PREDICTIVO_COMPACT", "").strip().lower()
+COMPACT_KEYS = {"cedula": ["CEDULA"], "cedula_telefono": ["CEDULA", "NUMERO TELEFONO"]}
+RESULT_PRIORITY = [r.strip().upper() for r in
+                   os.getenv("PREDICTIVO_RESULT_PRIORITY",
+                             "ANSWER-MACHINE,BUSY,NO-ANSWER,CONGESTION,FAILED").split(",") if r.strip()]
+
+# Lotes para RPA_Cargue (Predictivo/lotes/*_lote_###.csv): "0" = un solo
+# archivo, N = filas por lote, "auto" = tamaño según Logs/cargues_log.csv
+LOTE_ROWS_SETTING = os.getenv("PREDICTIVO_LOTE_ROWS", "0")
+
+# Omitir filas ya cargadas al CRM (registro de huellas de predictivo_huellas.py)
+DEDUP_ENABLED = os.getenv("PREDICTIVO_DEDUP", "1").strip() != "0"
+
+# Caché por etapa en Predictivo/.cache (re-ejecuciones tras una falla aguas abajo)
+CACHE_ENABLED       = os.getenv("PREDICTIVO_CACHE", "1").strip() != "0"
+CACHE_DIR           = PREDICTIVO_DIR / ".cache"
+CACHE_MAX_AGE_HOURS = float(os.getenv("PREDICTIVO_CACHE_MAX_AGE_H", "48") or 48)
+CACHE_MAX_MB        = float(os.getenv("PREDICTIVO_CACHE_MAX_MB", "500") or 500)
+CODE_FILES = [Path(__file__).resolve(), PROJECT_ROOT / "predictivo_transform.py", PROJECT_ROOT / "predictivo_arrow.py",
+              PROJECT_ROOT / "predictivo_multicanal.py", PROJECT_ROOT / "predictivo_json.py",
+              PROJECT_ROOT / "predictivo_wolkvox.py", PROJECT_ROOT / "predictivo_campanas.py"]
  
 FORMATO_COLUMNS = [
     "CEDULA","NUMERO TELEFONO","MENSAJE","ASESOR","FECHA GESTION","CANAL",
@@ -45,57 +146,35 @@ FORMATO_COLUMNS = [
 def yyyymmddhhmmss(dt: datetime) -> str:
     return dt.strftime("%Y%m%d%H%M%S")
  
-def compute_today_range_bogota():
+def compute_day_range_bogota(day: date):
     tz = ZoneInfo("America/Bogota")
-    now = datetime.now(tz)
-    start = datetime(year=now.year, month=now.month, day=now.day, hour=0, minute=0, second=0, tzinfo=tz)
-    end   = datetime(year=now.year, month=now.month, day=now.day, hour=23, minute=59, second=59, tzinfo=tz)
+    start = datetime(year=day.year, month=day.month, day=day.day, hour=0, minute=0, second=0, tzinfo=tz)
+    end   = datetime(year=day.year, month=day.month, day=day.day, hour=23, minute=59, second=59, tzinfo=tz)
     return yyyymmddhhmmss(start), yyyymmddhhmmss(end)
- 
-def read_template_columns(path: Path) -> list:
-    df_hdr = pd.read_csv(path, nrows=0, sep=";", dtype=str, engine="python")
-    cols = [(c.strip() if isinstance(c, str) else c) for c in df_hdr.columns]
-    cols = [c for c in cols if c and not str(c).lower().startswith("unnamed")]
-    return cols
+
+def compute_today_range_bogota():
+    return compute_day_range_bogota(datetime.now(ZoneInfo("America/Bogota")).date())
+
+def portafolio_output_file(portafolio: dict, day: date, folder: Path = None) -> Path:
+    """
+    Ruta del cargue de un portafolio para el día: su patrón output_file con
+    {fecha} (relativo a la raíz del proyecto) o, si se da folder, el mismo
+    nombre de archivo dentro de folder.
+    """
+    path = Path(portafolio["output_file"].format(fecha=day))
+    if folder is not None:
+        return folder / path.name
+    return path if path.is_absolute() else PROJECT_ROOT / path
+
+def backfill_output_file(day: date) -> Path:
+    """Salida aislada de un día de backfill: Predictivo/backfill/<día>/cargue_predictivo_<día>.csv"""
+    return portafolio_output_file(PORTAFOLIO_PROMOTORA, day, BACKFILL_DIR / str(day))
  
 def ensure_cols(df: pd.DataFrame, cols: list):
     for c in cols:
         if c not in df.columns:
             df[c] = ""
  
-def normalize_phone(x):
-    if pd.isna(x):
-        return None
-
-    # Extraer solo dígitos
-    digits = ''.join(ch for ch in str(x) if ch.isdigit())
-    if not digits:
-        return None
- 
-    # Casos de prefijos conocidos
-    if digits.startswith("957"):
-        digits = digits[3:]
-    elif digits.startswith("9"):
-        digits = digits[1:]
- 
-    # Validar que quede un celular colombiano válido
-    if len(digits) != 10 or not digits.startswith("3"):
-        return None
- 
-    try:
-        return int(digits)
-    except Exception:
-        return None
- 
-def parse_date_any(s):
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%d/%m/%Y %H:%M:%S",
-                "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%d/%m/%Y"):
-        try:
-            return pd.to_datetime(s, format=fmt, errors="raise")
-        except Exception:
-            pass
-    return pd.to_datetime(s, errors="coerce")
- 
 def pick_latest_local_csv(folder: Path) -> Path:
     if not folder.exists():
         raise FileNotFoundError(f"No existe la carpeta: {folder}")
@@ -104,17 +183,47 @@ def pick_latest_local_csv(folder: Path) -> Path:
         raise FileNotFoundError(f"No se encontró ningún .csv en: {folder}")
     return max(files, key=lambda p: p.stat().st_mtime)
  
-def read_multicanal_local(path: Path) -> pd.DataFrame:
-    try:
-        return pd.read_csv(path, sep=";", dtype=str, encoding="utf-8", engine="python")
-    except UnicodeDecodeError:
-        return pd.read_csv(path, sep=";", dtype=str, encoding="latin-1", engine="python")
- 
-def clean_cedula_value(x) -> str:
-    s = "" if pd.isna(x) else str(x).strip()
-    s = re.sub(r"\.0$", "", s)
-    s = s.replace(" ", "")
-    return s
+def load_portafolios(config_file: str = PORTAFOLIOS_FILE) -> list:
+    """
+    Lee la lista de portafolios (JSON) de PREDICTIVO_PORTAFOLIOS. Cada entrada:
+        {"opt1": "FONDO",                                   # obligatorio
+         "constantes": {"ASESOR": "vigfondo1", ...},        # se completan con las de PROMOTORA
+         "multicanal_dir": "Multicanal_Fondo",              # por defecto Multicanal/
+         "output_file": "Predictivo/fondo/cargue_predictivo_fondo_{fecha}.csv"}
+    Sin archivo configurado retorna solo PROMOTORA.
+    """
+    if not config_file:
+        return [PORTAFOLIO_PROMOTORA]
+    path = Path(config_file)
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path
+    entries = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path}: se esperaba una lista no vacía de portafolios")
+
+    portafolios = []
+    for entry in entries:
+        opt1 = str(entry.get("opt1", "")).strip().upper()
+        if not opt1:
+            raise ValueError(f"{path}: portafolio sin 'opt1': {entry}")
+        if any(p["opt1"] == opt1 for p in portafolios):
+            raise ValueError(f"{path}: opt1 repetido: {opt1}")
+        multicanal_dir = Path(entry.get("multicanal_dir", MULTICANAL_DIR))
+        slug = opt1.lower().replace(" ", "_")
+        default_output = (PORTAFOLIO_PROMOTORA["output_file"] if opt1 == "PROMOTORA"
+                          else f"Predictivo/{slug}/cargue_predictivo_{slug}_{{fecha}}.csv")
+        portafolios.append({
+            "opt1": opt1,
+            "constantes": {**CONSTANTES, **entry.get("constantes", {})},
+            "multicanal_dir": multicanal_dir if multicanal_dir.is_absolute() else PROJECT_ROOT / multicanal_dir,
+            "output_file": entry.get("output_file", default_output),
+        })
+    return portafolios
+
+def multicanal_csv_engine() -> str:
+    # Parser C por defecto; con el motor arrow, el de pyarrow (las dos columnas
+    # que se usan se limpian con strip igual, así que el resultado no cambia)
+    return "pyarrow" if TRANSFORM_ENGINE == "arrow" else "c"
  
 def sanitize_sms_text(text: str) -> str:
     """
@@ -128,26 +237,18 @@ def sanitize_sms_text(text: str) -> str:
     text = re.sub(r"[^a-zA-Z0-9\s\.,;:\-_()]", "", text)
     text = re.sub(r"\s+", " ", text).strip()
     return text
+
+def mensaje_predictivo(result) -> str:
+    """MENSAJE del cargue para un valor de RESULT (vacío si RESULT viene nulo)."""
+    if not isinstance(result, str):
+        return ""
+    return sanitize_sms_text("llamada predictiva resultado: " + result)
  
-def build_multicanal_map(df_multi: pd.DataFrame) -> pd.DataFrame:
-    if MULTI_COL_ID not in df_multi.columns:
-        raise ValueError(f"Multicanal: no existe la columna obligatoria '{MULTI_COL_ID}'")
-    if MULTI_COL_PROD not in df_multi.columns:
-        raise ValueError(f"Multicanal: no existe la columna obligatoria '{MULTI_COL_PROD}'")
- 
-    tmp = df_multi[[MULTI_COL_ID, MULTI_COL_PROD]].copy()
-    tmp.columns = ["CEDULA", "NUMERO PRODUCTO"]
- 
-    tmp["CEDULA"] = tmp["CEDULA"].apply(clean_cedula_value)
-    tmp["NUMERO PRODUCTO"] = tmp["NUMERO PRODUCTO"].astype(str).str.strip().fillna("")
- 
-    tmp = tmp[tmp["CEDULA"].ne("")].copy()
-    tmp = tmp.drop_duplicates(subset=["CEDULA"], keep="last")
-    return tmp
  
 # ========================= Núcleo API =========================
  
-def fetch_campaign3_json(date_ini: str, date_end: str) -> list:
+def campaign3_request(date_ini: str, date_end: str, stream: bool = False,
+                      session: requests.Session = None, campaign_id: str = "all") -> requests.Response:
     load_dotenv()
  
     server = os.getenv("OP04_SERVER")
@@ -156,14 +257,32 @@ def fetch_campaign3_json(date_ini: str, date_end: str) -> list:
         raise EnvironmentError("Faltan variables OP04_SERVER y/o OP04_TOKEN en .env")
  
     url = (
-        "https://wv0026.wolkvox.com/api/v2/reports_manager.php"
-        f"?api=campaign_3&campaign_id=all&date_ini={date_ini}&date_end={date_end}"
+        f"{WOLKVOX_REPORTS_URL}"
+        f"?api=campaign_3&campaign_id={campaign_id}&date_ini={date_ini}&date_end={date_end}"
     )
     headers = {"wolkvox_server": server, "wolkvox-token": token}
  
-    resp = requests.get(url, headers=headers, timeout=120)
+    resp = (session or requests).get(url, headers=headers, timeout=predictivo_wolkvox.TIMEOUT_S, stream=stream)
     resp.raise_for_status()
-    data = resp.json()
+    return resp
+
+def campaign3_chunks(date_ini: str, date_end: str, session: requests.Session = None, campaign_id: str = "all"):
+    """Bloques de bytes de la respuesta de campaign_3 (la llamada se hace al empezar a iterar)."""
+    with campaign3_request(date_ini, date_end, stream=True, session=session, campaign_id=campaign_id) as resp:
+        yield from resp.iter_content(JSON_CHUNK_BYTES)
+
+def fetch_campaign3_raw(date_ini: str, date_end: str, consume, session: requests.Session = None,
+                        campaign_id: str = "all"):
+    """consume(bloques de bytes) sobre la respuesta de la ventana, desde el caché de respuestas si sigue vigente."""
+    api = "campaign_3" if campaign_id == "all" else f"campaign_3-{campaign_id}"
+    return predictivo_respuestas.fetch(api, date_ini, date_end,
+                                       lambda: campaign3_chunks(date_ini, date_end, session, campaign_id), consume)
+
+def fetch_campaign3_json(date_ini: str, date_end: str, campaign_id: str = "all",
+                         session: requests.Session = None) -> list:
+    data = fetch_campaign3_raw(date_ini, date_end,
+                               lambda chunks: json.loads(b"".join(chunks).decode("utf-8-sig")), session,
+                               campaign_id)
  
     if isinstance(data, dict):
         for k in ("data", "result", "results", "items"):
@@ -177,10 +296,71 @@ def fetch_campaign3_json(date_ini: str, date_end: str) -> list:
         return data
     else:
         raise ValueError("Respuesta JSON no reconocida.")
+
+def fetch_campaign3_frame(date_ini: str, date_end: str, opt1s: list, campaign_id: str = "all",
+                          session: requests.Session = None) -> pd.DataFrame:
+    """
+    campaign_3 leído por bloques (predictivo_json): solo los registros de los
+    portafolios opt1s y sin ANSWER, ya como DataFrame. attrs["payload_fp"]
+    es el SHA-256 de la respuesta (llave del caché).
+    """
+    return fetch_campaign3_raw(date_ini, date_end, partial(campaign_frame, opt1s=opt1s), session, campaign_id)
+
+def print_respuestas_stats():
+    if not predictivo_respuestas.ENABLED:
+        return
+    stats = predictivo_respuestas.take_stats()
+    refresh = " (--no-cache: no se leyó lo guardado)" if predictivo_respuestas.REFRESH else ""
+    print(f"Caché de respuestas: {stats['hit']} hit, {stats['miss']} miss "
+          f"({stats['bytes'] / 1e6:.1f} MB comprimidos){refresh}")
+
+def fetch_campaign3(date_ini: str, date_end: str, opt1s: list, stream: bool = None,
+                    force_all: bool = False):
+    """
+    Registros de campaign_3 para run_predictivo: el rango se pide en
+    ventanas concurrentes con reintentos (predictivo_wolkvox) y se une sin
+    conn_id repetidos, en el orden canónico (date, conn_id) de sort_frame
+    sin importar cómo se pidió. Con un mapa vigente de predictivo_campanas
+    se pide cada campaña de los portafolios por separado (ventana x
+    campaña); si no (o con force_all), campaign_id=all y, si el rango es un
+    día completo, se reaprende el mapa.
+    DataFrame filtrado (stream; por defecto PREDICTIVO_JSON_STREAM) o lista
+    de dicts.
+    """
+    windows = shard_windows(date_ini, date_end, predictivo_wolkvox.SHARD_MINUTES)
+    campaign_ids = predictivo_campanas.resolve_campaign_ids(opt1s, force=force_all)
+    tasks = [(ini, end, cid) for ini, end in windows for cid in (campaign_ids or ["all"])]
+    workers = max(1, min(predictivo_wolkvox.SHARD_WORKERS, len(tasks)))
+    campanas = f"campañas {', '.join(campaign_ids)}" if campaign_ids else "campaign_id=all"
+    print(f"campaign_3: {date_ini} -> {date_end} en {len(windows)} ventana(s) x {campanas}, "
+          f"{workers} en paralelo")
+    learn = campaign_ids is None and predictivo_campanas.is_full_day(date_ini, date_end)
+    if not (JSON_STREAM if stream is None else stream):
+        # orden canónico (date, conn_id): compact_attempts y el cargue dependen del orden de
+        # las filas, y el de la API no está documentado ni es el mismo por campaña que con all
+        records = sort_records(merge_records(fetch_windows(fetch_campaign3_json, tasks, workers)))
+        print_respuestas_stats()
+        print(f"campaign_3: {len(records)} registros")
+        if learn:
+            pairs = [(r.get("opt1"), r.get("campaign_id")) for r in records if isinstance(r, dict)]
+            predictivo_campanas.learn_campaign_ids(pd.DataFrame(pairs, columns=["opt1", "campaign_id"]), opt1s)
+        return records
+
+    fetch_window = lambda ini, end, cid, session: fetch_campaign3_frame(ini, end, opt1s, cid, session)
+    df = sort_frame(merge_frames(fetch_windows(fetch_window, tasks, workers)))
+    print_respuestas_stats()
+    print(f"JSON campaign_3: {df.attrs['leidos']} registros leídos, {df.attrs['conservados']} de los portafolios"
+          f" ({df.attrs['duplicados']} conn_id repetidos entre ventanas)")
+    if learn:
+        # pares (opt1, campaign_id) de antes del filtro de RESULT: df ya no trae las filas ANSWER
+        pairs = pd.DataFrame(df.attrs["campanas"], columns=["opt1", "campaign_id"])
+        predictivo_campanas.learn_campaign_ids(pairs, opt1s)
+    return df
  
 # ========================= Transformación =========================
  
-def build_cargue_from_df(df_campaign: pd.DataFrame, template_path: Path, multicanal_map: pd.DataFrame) -> pd.DataFrame:
+def build_cargue_pandas(df_campaign: pd.DataFrame, template_path: Path, multicanal_map: pd.DataFrame,
+                        verbose: bool = True, constantes: dict = CONSTANTES) -> pd.DataFrame:
     rename_map = {
         "campaign_id": "CAMPAIGN_ID",
         "customer_name": "CUSTOMER_NAME",
@@ -194,7 +374,8 @@ def build_cargue_from_df(df_campaign: pd.DataFrame, template_path: Path, multica
         "opt6": "OPT6", "opt7": "OPT7", "opt8": "OPT8", "opt9": "OPT9", "opt10": "OPT10",
         "opt11": "OPT11", "opt12": "OPT12", "conn_id": "CONN_ID"
     }
-    df = df_campaign.rename(columns=rename_map).copy()
+    t_start = time.perf_counter()
+    df = df_campaign.rename(columns=rename_map)
  
     required = {"CUSTOMER_ID", "TELEPHONE", "RESULT", "DATE"}
     missing = required - set(df.columns)
@@ -202,128 +383,382 @@ def build_cargue_from_df(df_campaign: pd.DataFrame, template_path: Path, multica
         raise ValueError(f"Faltan columnas requeridas en la fuente: {missing}")
  
     # === FILTRO: quitar ANSWER ===
-    df["RESULT"] = df["RESULT"].astype(str)
-    df = df[~df["RESULT"].str.upper().eq("ANSWER")].copy()
+    # (máscara: solo se materializan las columnas que se usan, no el frame completo)
+    result = df["RESULT"].astype(str)
+    rows = ~result.str.upper().eq("ANSWER")
  
     # Teléfono limpio
-    df["NUM_TELEPHONE_CLEAN"] = df["TELEPHONE"].apply(normalize_phone)
+    # (validación mínima: las filas sin teléfono válido no llegan a la salida,
+    # así que el resto de columnas se calcula solo para las que quedan, sin
+    # volver a filtrar cada columna al final)
+    phone = normalize_phone_series(df["TELEPHONE"][rows])
+    keep = phone.notna().to_numpy()
+    pos = np.flatnonzero(rows.to_numpy())[keep]
+    phone = phone[keep]
+    idx = phone.index
+    result = result.iloc[pos]
  
     # MENSAJE (sanitizado)
-    df["MENSAJE_TMP"] = ("llamada predictiva resultado: " + df["RESULT"].astype(str)).apply(sanitize_sms_text)
+    # (una sanitización por valor distinto de RESULT, repartida por código)
+    mensaje = map_unique(result, mensaje_predictivo)
  
     # FECHA GESTION
-    dt = df["DATE"].apply(parse_date_any)
-    df["FECHA_GESTION_FMT"] = dt.dt.strftime("%d/%m/%Y %H:%M:%S")
+    dt, n_fallback = parse_date_series(df["DATE"].iloc[pos])
+    if verbose:
+        print(f"FECHA GESTION: {n_fallback} de {len(dt)} fila(s) por ruta lenta (parse_date_any)")
+    fecha = format_date_series(dt, "%d/%m/%Y %H:%M:%S")
  
     # Normalizar CEDULA para join
-    df["CEDULA_JOIN"] = df["CUSTOMER_ID"].apply(clean_cedula_value)
+    # (Int64 compacto; el texto se genera recién al escribir el CSV. La CEDULA
+    # vacía queda como <NA> y, como antes, se conserva y se escribe vacía)
+    cedula = compact_id_series(clean_cedula_series(df["CUSTOMER_ID"].iloc[pos]))
  
     # Join con multicanal (traer NUMERO PRODUCTO)
-    joined = df.merge(multicanal_map, left_on="CEDULA_JOIN", right_on="CEDULA", how="left")
-    joined["NUMERO PRODUCTO"] = joined["NUMERO PRODUCTO"].fillna("").astype(str).str.strip()
- 
-    # Construcción salida
-    out = pd.DataFrame({
-        "CEDULA": joined["CEDULA_JOIN"],
-        "NUMERO TELEFONO": joined["NUM_TELEPHONE_CLEAN"],
-        "MENSAJE": joined["MENSAJE_TMP"],
-        "ASESOR": CONSTANTES["ASESOR"],
-        "FECHA GESTION": joined["FECHA_GESTION_FMT"],
-        "CANAL": CONSTANTES["CANAL"],
-        "ESTADO CLIENTE": CONSTANTES["ESTADO CLIENTE"],
-        "ESTADO CONTACTO": CONSTANTES["ESTADO CONTACTO"],
-        "NIVEL1": CONSTANTES["NIVEL1"],
-        "NIVEL2": CONSTANTES["NIVEL2"],
-        "NIVEL3": CONSTANTES["NIVEL3"],
-        "NIVEL4": CONSTANTES["NIVEL4"],
-        "NIVEL5": "",
-        "NIVEL6": "",
-        "NIVEL7": "",
-        "NIVEL8": "",
-        "NIVEL9": "",
-        "NIVEL10": "",
-        "NUMERO PRODUCTO": joined["NUMERO PRODUCTO"],
-    })
- 
-    # Validaciones mínimas
-    out = out.dropna(subset=["CEDULA", "NUMERO TELEFONO"]).copy()
-    out["NUMERO TELEFONO"] = out["NUMERO TELEFONO"].astype("Int64")
- 
-    # Respetar orden del template
-    tpl_cols = read_template_columns(template_path) if template_path.exists() else []
-    final_cols = tpl_cols[:] if tpl_cols else FORMATO_COLUMNS
- 
-    for col in FORMATO_COLUMNS:
-        if col not in final_cols:
-            final_cols.append(col)
- 
-    final_cols = [c for c in final_cols if c and not str(c).lower().startswith("unnamed")]
- 
-    for col in final_cols:
-        if col not in out.columns:
-            out[col] = ""
- 
-    out.columns = [c.strip() if isinstance(c, str) else c for c in out.columns]
-    out = out[final_cols].map(lambda v: v.strip() if isinstance(v, str) else v).fillna("")
+    producto = lookup_numero_producto(cedula, multicanal_map)
+ 
+    # Construcción salida en el orden del template (constantes CRM como categóricas)
+    t_final = time.perf_counter()
+    final_cols = resolve_output_columns(template_path, FORMATO_COLUMNS)
+    out = finalize_output({
+        "CEDULA": cedula,
+        "NUMERO TELEFONO": phone,
+        "MENSAJE": mensaje,
+        "ASESOR": constant_column(constantes["ASESOR"], idx),
+        "FECHA GESTION": fecha,
+        "CANAL": constant_column(constantes["CANAL"], idx),
+        "ESTADO CLIENTE": constant_column(constantes["ESTADO CLIENTE"], idx),
+        "ESTADO CONTACTO": constant_column(constantes["ESTADO CONTACTO"], idx),
+        "NIVEL1": constant_column(constantes["NIVEL1"], idx),
+        "NIVEL2": constant_column(constantes["NIVEL2"], idx),
+        "NIVEL3": constant_column(constantes["NIVEL3"], idx),
+        "NIVEL4": constant_column(constantes["NIVEL4"], idx),
+        "NIVEL5": constant_column("", idx),
+        "NIVEL6": constant_column("", idx),
+        "NIVEL7": constant_column("", idx),
+        "NIVEL8": constant_column("", idx),
+        "NIVEL9": constant_column("", idx),
+        "NIVEL10": constant_column("", idx),
+        "NUMERO PRODUCTO": producto,
+    }, idx, final_cols, trimmed={"CEDULA", "MENSAJE", "FECHA GESTION", "NUMERO PRODUCTO"})
+    t_final = time.perf_counter() - t_final
+
+    t_total = time.perf_counter() - t_start
+    if verbose:
+        print(f"Finalización salida: {t_final:.3f} s ({t_final / t_total:.0%} del transform)")
+    return out
+
+def build_cargue_arrow(df_campaign: pd.DataFrame, template_path: Path, multicanal_map: pd.DataFrame,
+                       verbose: bool = True, constantes: dict = CONSTANTES) -> pd.DataFrame:
+    return predictivo_arrow.build_cargue(df_campaign, template_path, multicanal_map, verbose,
+                                         constantes=constantes, default_cols=FORMATO_COLUMNS,
+                                         mensaje_fn=mensaje_predictivo)
+
+TRANSFORM_ENGINES = {"pandas": build_cargue_pandas, "arrow": build_cargue_arrow}
+
+def build_cargue_from_df(df_campaign: pd.DataFrame, template_path: Path, multicanal_map: pd.DataFrame,
+                         verbose: bool = True, constantes: dict = CONSTANTES) -> pd.DataFrame:
+    """Transforma con el motor elegido en PREDICTIVO_ENGINE (pandas | arrow)."""
+    build_fn = TRANSFORM_ENGINES.get(TRANSFORM_ENGINE)
+    if build_fn is None:
+        raise ValueError(f"PREDICTIVO_ENGINE no reconocido: {TRANSFORM_ENGINE!r} "
+                         f"(opciones: {', '.join(TRANSFORM_ENGINES)})")
+    return build_fn(df_campaign, template_path, multicanal_map, verbose, constantes)
+
+def compact_cargue(out: pd.DataFrame) -> pd.DataFrame:
+    """
+    Etapa opcional (PREDICTIVO_COMPACT): pliega los intentos de marcación a
+    la gestión más reciente por CEDULA o por (CEDULA, NUMERO TELEFONO).
+    Corre sobre la salida completa, así que también pliega intentos que
+    cayeron en particiones distintas del transform paralelo.
+    """
+    if not COMPACT_MODE:
+        return out
+    keys = COMPACT_KEYS.get(COMPACT_MODE)
+    if keys is None:
+        raise ValueError(f"PREDICTIVO_COMPACT no reconocido: {COMPACT_MODE!r} "
+                         f"(opciones: {', '.join(COMPACT_KEYS)})")
+
+    mensaje_rank = {mensaje_predictivo(r).upper(): i for i, r in enumerate(RESULT_PRIORITY)}
+    compacted, n_folded = compact_attempts(out, keys, mensaje_rank)
+    print(f"Compactación ({COMPACT_MODE}): {n_folded} intento(s) plegados, "
+          f"{len(out)} -> {len(compacted)} filas")
+    return compacted
+
+def write_cargue(out: pd.DataFrame, output_file: Path = OUTPUT_FILE) -> list:
+    """
+    Escribe la salida en output_file o, si PREDICTIVO_LOTE_ROWS está activo,
+    en lotes (carpeta lotes/ junto a output_file). Retorna las rutas escritas.
+    """
+    lote_rows = resolve_lote_rows(LOTE_ROWS_SETTING)
+    if lote_rows <= 0:
+        out.to_csv(output_file, index=False, encoding="utf-8", sep=";")
+        print(f"OK -> {output_file}")
+        return [output_file]
+    lotes_dir = output_file.parent / "lotes"
+    lotes = write_lotes(out, output_file, lote_rows, lotes_dir)
+    print(f"OK -> {len(lotes)} lote(s) de hasta {lote_rows} filas en {lotes_dir}")
+    return lotes
+
+def drop_loaded_rows(out: pd.DataFrame) -> pd.DataFrame:
+    """Etapa opcional (PREDICTIVO_DEDUP): quita las filas que RPA_Cargue ya subió al CRM."""
+    if not DEDUP_ENABLED:
+        return out
+    out, n_omitidas = filter_unseen(out)
+    print(f"Huellas: {n_omitidas} fila(s) ya cargadas al CRM se omiten")
     return out
  
-# ========================= Main =========================
- 
-def main():
-    load_dotenv()
-    PREDICTIVO_DIR.mkdir(parents=True, exist_ok=True)
+# ========================= Portafolios =========================
+
+def filter_portafolios(df: pd.DataFrame, opt1s: list) -> pd.DataFrame:
+    """Filas de cualquiera de los portafolios configurados (un solo filtro sobre el día completo)."""
+    ensure_cols(df, ["opt1", "telephone", "result", "date", "customer_id"])
+    return df[df["opt1"].astype(str).str.upper().isin(opt1s)]
+
+def split_portafolios(df: pd.DataFrame, opt1s: list) -> dict:
+    """
+    Reparte las filas por opt1 con un solo groupby (en vez de un filtro por
+    portafolio). Cada grupo conserva el orden original de las filas; los
+    portafolios sin registros no aparecen en el resultado.
+    """
+    ensure_cols(df, ["opt1", "telephone", "result", "date", "customer_id"])
+    positions = df.groupby(df["opt1"].astype(str).str.upper(), sort=False).indices
+    return {opt1: df.take(positions[opt1]) for opt1 in opt1s if opt1 in positions}
+
+# ========================= Streaming =========================
+ 
+def result_counts(df: pd.DataFrame) -> pd.Series:
+    """Conteo por RESULT sin ANSWER, calculado sobre la columna (sin copiar el frame)."""
+    result = df["result"].astype(str)
+    return result[~result.str.upper().eq("ANSWER")].value_counts()
+ 
+def iter_record_chunks(records, chunk_rows: int):
+    """Parte un iterable de registros (dicts), o un DataFrame, en bloques de hasta chunk_rows."""
+    if isinstance(records, pd.DataFrame):
+        for start in range(0, len(records), chunk_rows):
+            yield records.iloc[start:start + chunk_rows].reset_index(drop=True)
+        return
+    it = iter(records)
+    while True:
+        batch = list(islice(it, chunk_rows))
+        if not batch:
+            return
+        yield batch
+ 
+def write_cargue_streaming(records, template_path: Path, jobs: list, chunk_rows: int) -> dict:
+    """
+    Transforma los registros por bloques de chunk_rows; cada bloque se reparte
+    por portafolio y se agrega a su output_file (header solo en el primer
+    bloque). jobs son los portafolios con "multicanal_map" y "output_file"
+    resueltos. Cada archivo es idéntico byte a byte al de build_cargue_from_df
+    sobre todo el día.
+    Retorna {opt1: (filas escritas, conteo por RESULT)}; filas = None si
+    ningún bloque trajo registros del portafolio (no se escribe archivo).
+    """
+    opt1s = [job["opt1"] for job in jobs]
+    rows_written = dict.fromkeys(opt1s)
+    res_counts = {opt1: pd.Series(dtype="int64") for opt1 in opt1s}
+    n_omitidas = 0
+ 
+    for batch in iter_record_chunks(records, chunk_rows):
+        grupos = split_portafolios(pd.DataFrame(batch), opt1s)
+        del batch
+        for job in jobs:
+            opt1 = job["opt1"]
+            df = grupos.get(opt1)
+            if df is None:
+                continue
+ 
+            out = build_cargue_from_df(df, template_path, job["multicanal_map"], verbose=False,
+                                       constantes=job["constantes"])
+            if DEDUP_ENABLED:
+                out, n_block = filter_unseen(out)
+                n_omitidas += n_block
+            first = rows_written[opt1] is None
+            out.to_csv(job["output_file"], mode="w" if first else "a", header=first,
+                       index=False, encoding="utf-8", sep=";")
+            rows_written[opt1] = (rows_written[opt1] or 0) + len(out)
+ 
+            res_counts[opt1] = res_counts[opt1].add(result_counts(df), fill_value=0).astype("int64")
+ 
+    if DEDUP_ENABLED:
+        print(f"Huellas: {n_omitidas} fila(s) ya cargadas al CRM se omiten")
+    return {opt1: (rows_written[opt1], res_counts[opt1].sort_values(ascending=False, kind="stable"))
+            for opt1 in opt1s}
+
+def split_streamed_cargue(output_file: Path) -> list:
+    """Con PREDICTIVO_LOTE_ROWS activo parte el CSV escrito por bloques en lotes; retorna las rutas finales."""
+    lote_rows = resolve_lote_rows(LOTE_ROWS_SETTING)
+    if lote_rows <= 0:
+        print(f"OK -> {output_file}")
+        return [output_file]
+    lotes_dir = output_file.parent / "lotes"
+    written = split_csv_file(output_file, lote_rows, lotes_dir) or [output_file]
+    print(f"OK -> {len(written)} lote(s) de hasta {lote_rows} filas en {lotes_dir}")
+    return written
  
-    if not TEMPLATE_PATH.exists():
-        raise FileNotFoundError(f"No existe el template: {TEMPLATE_PATH}")
+# ========================= Main =========================
  
-    # 1) Multicanal local (último descargado)
-    multicanal_file = pick_latest_local_csv(MULTICANAL_DIR)
+def write_empty_cargue(output_file: Path = OUTPUT_FILE, opt1: str = "PROMOTORA"):
+    print(f"No se encontraron registros para {opt1} hoy.")
+    tpl_cols = read_template_columns(TEMPLATE_PATH)
+    pd.DataFrame(columns=tpl_cols if tpl_cols else FORMATO_COLUMNS) \
+        .to_csv(output_file, index=False, encoding="utf-8", sep=";")
+    print(f"CSV vacío -> {output_file}")
+
+def print_result_counts(n_rows: int, counts: pd.Series):
+    """Log de control por RESULT (después del filtro)."""
+    print(f"Filas generadas: {n_rows}")
+    res_counts = counts.rename_axis("RESULT").reset_index(name="COUNT")
+    if not res_counts.empty:
+        print(res_counts.to_string(index=False))
+
+def load_multicanal_map(folder: Path) -> tuple:
+    """
+    Último Multicanal descargado en folder -> (huella del archivo, map
+    indexado por CEDULA). El map sale del índice persistente de
+    predictivo_multicanal (Multicanal/.index/) si sigue vigente.
+    """
+    multicanal_file = pick_latest_local_csv(folder)
     print(f"Usando Multicanal local: {multicanal_file}")
  
-    df_multi = read_multicanal_local(multicanal_file)
-    multicanal_map = build_multicanal_map(df_multi)
+    multicanal_fp = file_fingerprint(multicanal_file)
+    multicanal_map = load_or_build_index(multicanal_file, multicanal_csv_engine())
     print(f"Multicanal map (CEDULA únicos): {len(multicanal_map)}")
+    return multicanal_fp, multicanal_map
  
-    # 2) Fechas automáticas (hoy en Bogotá)
-    date_ini, date_end = compute_today_range_bogota()
+def run_predictivo(fetch_records, day: date, output_dir: Path = None, portafolios: list = None) -> int:
+    """
+    Pipeline completo para un rango de la API: fetch_records(opt1s) trae los
+    registros de campaign_3 una sola vez (lista de dicts, o DataFrame ya
+    filtrado por opt1 con attrs["payload_fp"]) y se genera el cargue de cada
+    portafolio (por defecto los de PREDICTIVO_PORTAFOLIOS) en su output_file
+    para day, o dentro de output_dir si se da (backfill). Retorna las filas
+    generadas entre todos los portafolios.
+    """
+    load_dotenv()
  
-    # 3) Traer datos desde API
-    records = fetch_campaign3_json(date_ini, date_end)
-    df = pd.DataFrame(records)
-    ensure_cols(df, ["opt1", "telephone", "result", "date", "customer_id"])
+    if not TEMPLATE_PATH.exists():
+        raise FileNotFoundError(f"No existe el template: {TEMPLATE_PATH}")
  
-    # 4) Filtrar solo PROMOTORA
-    df = df[df["opt1"].astype(str).str.upper().eq("PROMOTORA")].copy()
+    portafolios = portafolios or load_portafolios()
+    opt1s = [pf["opt1"] for pf in portafolios]
+    print(f"Portafolios: {', '.join(opt1s)}")
  
-    # 5) Si no hay datos, generar CSV vacío con headers del template
-    if df.empty:
-        print("No se encontraron registros para PROMOTORA hoy.")
-        tpl_cols = read_template_columns(TEMPLATE_PATH)
-        pd.DataFrame(columns=tpl_cols if tpl_cols else FORMATO_COLUMNS) \
-            .to_csv(OUTPUT_FILE, index=False, encoding="utf-8", sep=";")
-        print(f"CSV vacío -> {OUTPUT_FILE}")
+    cache = StageCache(CACHE_DIR, CACHE_MAX_AGE_HOURS, CACHE_MAX_MB, enabled=CACHE_ENABLED)
+    code_fp = content_fingerprint(*CODE_FILES) + TRANSFORM_ENGINE
+    template_fp = content_fingerprint(TEMPLATE_PATH)
+    timings = {}
+    t_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # 2-3) Traer datos desde API (el rango de fechas lo define quien llama); la
+        # llamada HTTP corre en un hilo mientras se lee e indexa el Multicanal
+        fetch = pool.submit(timed, timings, "fetch API", fetch_records, opt1s)
+
+        # 1) Multicanal local (último descargado), una vez por carpeta aunque la compartan varios portafolios
+        multicanal = {}
+        jobs = []
+        for pf in portafolios:
+            folder = pf["multicanal_dir"]
+            if folder not in multicanal:
+                multicanal[folder] = timed(timings, "multicanal", load_multicanal_map, folder)
+            multicanal_fp, multicanal_map = multicanal[folder]
+            output_file = portafolio_output_file(pf, day, output_dir)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            jobs.append({**pf, "output_file": output_file,
+                         "multicanal_fp": multicanal_fp, "multicanal_map": multicanal_map})
+
+        records = fetch.result()
+    overlap_wall = time.perf_counter() - t_start
+    written = []
+    n_total = 0
+ 
+    if STREAM_CHUNK_ROWS > 0:
+        # 4-7) Repartir, transformar y guardar por bloques
+        print(f"Modo streaming: bloques de {STREAM_CHUNK_ROWS} registros")
+        if COMPACT_MODE:
+            print("PREDICTIVO_COMPACT se ignora en modo streaming (requiere el día completo)")
+        results = timed(timings, "transform + escritura", write_cargue_streaming,
+                        records, TEMPLATE_PATH, jobs, STREAM_CHUNK_ROWS)
+        del records
+        for job in jobs:
+            print(f"--- Portafolio {job['opt1']} ---")
+            n_rows, counts = results[job["opt1"]]
+            if n_rows is None:
+                write_empty_cargue(job["output_file"], job["opt1"])
+                continue
+            written += timed(timings, "lotes", split_streamed_cargue, job["output_file"])
+            print_result_counts(n_rows, counts)
+            n_total += n_rows
+    else:
+        if isinstance(records, pd.DataFrame) and "payload_fp" in records.attrs:
+            payload_fp = records.attrs["payload_fp"]
+        elif cache.enabled:
+            payload_fp = timed(timings, "fuente", payload_fingerprint, records)
+        else:
+            payload_fp = None  # sin caché la llave no se usa: no se serializa el payload del día
+ 
+        # 4) Filtrar los portafolios configurados y repartir por opt1 (un solo groupby)
+        df_all = timed(timings, "fuente", cache.run, "fuente", [payload_fp, code_fp, *opt1s],
+                       lambda: filter_portafolios(pd.DataFrame(records), opt1s))
+        del records
+        grupos = timed(timings, "fuente", split_portafolios, df_all, opt1s)
+        del df_all
+ 
+        for job in jobs:
+            print(f"--- Portafolio {job['opt1']} ---")
+            df = grupos.pop(job["opt1"], None)
+ 
+            # 5) Si no hay datos, generar CSV vacío con headers del template
+            if df is None:
+                write_empty_cargue(job["output_file"], job["opt1"])
+                continue
+ 
+            # 6) Transformar a formato de cargue (con NUMERO PRODUCTO y las constantes del portafolio)
+            build_fn = partial(build_cargue_from_df, constantes=job["constantes"])
+            constantes_fp = json.dumps(job["constantes"], sort_keys=True, ensure_ascii=False)
+            out = timed(timings, "transform", cache.run,
+                "cargue", [job["opt1"], constantes_fp, COMPACT_MODE, *RESULT_PRIORITY,
+                           payload_fp, job["multicanal_fp"], template_fp, code_fp],
+                lambda: compact_cargue(parallel_build_cargue(build_fn, df, TEMPLATE_PATH,
+                                                             job["multicanal_map"], TRANSFORM_WORKERS)),
+            )
+            out = timed(timings, "huellas", drop_loaded_rows, out)
+ 
+            # 7) Guardar CSV final (o lotes)
+            written += timed(timings, "escritura", write_cargue, out, job["output_file"])
+ 
+            # 8) Log de control por RESULT (después del filtro)
+            print_result_counts(len(out), result_counts(df))
+            n_total += len(out)
+
+    # 9) Validación previa al cargue (RPA_Cargue no sube los archivos que fallan)
+    timed(timings, "validación", validate_files, written, TEMPLATE_PATH)
+    print_stage_timings(timings, time.perf_counter() - t_start,
+                        overlapped=("fetch API", "multicanal"), overlap_wall=overlap_wall)
+    return n_total
+
+def main():
+    parser = argparse.ArgumentParser(description="Cargue predictivo del día desde campaign_3 (Wolkvox)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="no usar las respuestas de Wolkvox guardadas en Predictivo/.respuestas (se refrescan)")
+    args = parser.parse_args()
+    if args.no_cache:
+        predictivo_respuestas.REFRESH = True
+
+    # Fechas automáticas (hoy en Bogotá)
+    today = datetime.now(ZoneInfo("America/Bogota")).date()
+    date_ini, date_end = compute_day_range_bogota(today)
+    if predictivo_ingesta.INGESTA_ENABLED:
+        # fuente: almacén local del poller (predictivo_ingesta) + los minutos que falten
+        fetch_window = partial(fetch_campaign3, stream=True)
+        run_predictivo(lambda opt1s: predictivo_ingesta.catch_up(today, opt1s, fetch_window), today)
         return
- 
-    # 6) Transformar a formato de cargue (con NUMERO PRODUCTO)
-    out = build_cargue_from_df(df, TEMPLATE_PATH, multicanal_map)
- 
-    # 7) Guardar CSV final
-    out.to_csv(OUTPUT_FILE, index=False, encoding="utf-8", sep=";")
- 
-    # 8) Log de control por RESULT (después del filtro)
-    df_log = df.copy()
-    df_log["result"] = df_log["result"].astype(str)
-    df_log = df_log[~df_log["result"].str.upper().eq("ANSWER")]
-    res_counts = df_log["result"].value_counts().rename_axis("RESULT").reset_index(name="COUNT")
- 
-    print(f"OK -> {OUTPUT_FILE}")
-    print(f"Filas generadas: {len(out)}")
-    if not res_counts.empty:
-        print(res_counts.to_string(index=False))
+    run_predictivo(lambda opt1s: fetch_campaign3(date_ini, date_end, opt1s), today)
  
 if __name__ == "__main__":
     try:
         main()
     except Exception as e:
         print("ERROR:", e, file=sys.stderr)
-        sys.exit(2)
\ No newline at end of file
+        sys.exit(2)
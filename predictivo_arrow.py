@@ -0,0 +1,172 @@
+"""
+Motor Arrow del transform predictivo (PREDICTIVO_ENGINE=arrow).
+
+Misma salida que build_cargue_pandas de main_predictivo.py /
+predictivo_sabado.py, pero el filtro ANSWER, la limpieza de teléfono y
+cédula, el parseo de fechas y el join con el Multicanal se hacen con
+kernels de pyarrow.compute. pyarrow es opcional: solo se exige al usar este
+motor.
+"""
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # motor opcional
+    pa = pc = None
+
+from predictivo_transform import (
+    PHONE_LEN,
+    constant_column,
+    finalize_output,
+    id_as_text,
+    parse_date_any,
+    rank_date_formats,
+    resolve_output_columns,
+)
+
+SOURCE_COLUMNS = {
+    "customer_id": "CUSTOMER_ID",
+    "telephone": "TELEPHONE",
+    "result": "RESULT",
+    "date": "DATE",
+}
+
+_CANONICAL_ID_RE = r"^(0|[1-9][0-9]{0,17})$"
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("PREDICTIVO_ENGINE=arrow requiere pyarrow (pip install pyarrow)")
+
+def _to_arrow_text(s: pd.Series):
+    """Columna pandas -> arreglo Arrow de texto (str() por valor, nulos como null)."""
+    return pa.array(s.astype("string"), type=pa.string())
+
+def _to_pandas(arr) -> pd.Series:
+    return arr.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+# ========================= Kernels Arrow =========================
+
+def phone_arrow(tel):
+    """normalize_phone con pyarrow.compute: int64 con null para inválidos."""
+    digits = pc.replace_substring_regex(tel, r"[^0-9]", "")
+    digits = pc.if_else(
+        pc.starts_with(digits, "957"), pc.utf8_slice_codeunits(digits, 3),
+        pc.if_else(pc.starts_with(digits, "9"), pc.utf8_slice_codeunits(digits, 1), digits),
+    )
+    valid = pc.and_(pc.equal(pc.utf8_length(digits), PHONE_LEN), pc.starts_with(digits, "3"))
+    return pc.cast(pc.if_else(valid, digits, pa.scalar(None, pa.string())), pa.int64())
+
+def cedula_arrow(ced):
+    """clean_cedula_value con pyarrow.compute: "" para nulos, strip, sin ".0" final ni espacios."""
+    ced = pc.utf8_trim_whitespace(pc.fill_null(ced, ""))
+    ced = pc.replace_substring_regex(ced, r"\.0$", "")
+    return pc.replace_substring(ced, " ", "")
+
+def dates_arrow(dates, sample: pd.Series) -> tuple:
+    """
+    Igual que parse_date_series: un strptime por formato (ordenados con la
+    muestra) y parse_date_any solo para lo que ninguno reconoce.
+    Retorna (texto "%d/%m/%Y %H:%M:%S" con null si no hay fecha, filas_por_ruta_lenta).
+    """
+    parsed = pa.nulls(len(dates), type=pa.timestamp("s"))
+    for fmt in rank_date_formats(sample):
+        parsed = pc.coalesce(parsed, pc.strptime(dates, format=fmt, unit="s", error_is_null=True))
+
+    pending = pc.and_(pc.is_null(parsed), pc.is_valid(dates)).to_numpy(zero_copy_only=False)
+    idx = np.flatnonzero(pending)
+    if len(idx):
+        slow = pd.Series([parse_date_any(v) for v in pc.take(dates, idx).to_pylist()], dtype="datetime64[ns]")
+        ts = parsed.cast(pa.timestamp("ns")).to_numpy(zero_copy_only=False).copy()
+        ts[idx] = slow.to_numpy()
+        parsed = pa.array(ts, type=pa.timestamp("ns"))
+    # En unidad "s" (truncando) para que %S no agregue fracciones de segundo
+    parsed = pc.cast(parsed, pa.timestamp("s"), safe=False)
+    return pc.strftime(parsed, format="%d/%m/%Y %H:%M:%S"), len(idx)
+
+def mensaje_arrow(result, mensaje_fn):
+    """mensaje_fn una vez por valor distinto de RESULT (dictionary_encode + take)."""
+    enc = pc.dictionary_encode(result)
+    derived = pa.array([mensaje_fn(v) for v in enc.dictionary.to_pylist()], type=pa.string())
+    return pc.fill_null(pc.take(derived, enc.indices), "")
+
+def producto_arrow(cedula, multicanal_map: pd.DataFrame):
+    """
+    NUMERO PRODUCTO por CEDULA con pc.index_in contra el índice del Multicanal
+    map (index_multicanal_map). Con llaves int64 solo pueden coincidir las
+    cédulas canónicas, que se castean a int64 antes de buscar.
+    """
+    keys = multicanal_map.index
+    if pd.api.types.is_integer_dtype(keys.dtype):
+        value_set = pa.array(keys.to_numpy(dtype=np.int64))
+        canonical = pc.match_substring_regex(cedula, _CANONICAL_ID_RE)
+        target = pc.cast(pc.if_else(canonical, cedula, pa.scalar(None, pa.string())), pa.int64())
+    else:
+        value_set = pa.array(keys.to_numpy(dtype=object), type=pa.string())
+        target = cedula
+    pos = pc.index_in(target, value_set=value_set)
+
+    producto = multicanal_map["NUMERO PRODUCTO"]
+    if pd.api.types.is_integer_dtype(producto.dtype):
+        return pc.take(pa.array(producto.array, type=pa.int64()), pos)
+    values = pa.array(id_as_text(producto).to_numpy(dtype=object), type=pa.string())
+    return pc.fill_null(pc.take(values, pos), "")
+
+# ========================= Transform =========================
+
+def build_cargue(df_campaign: pd.DataFrame, template_path: Path, multicanal_map: pd.DataFrame,
+                 verbose: bool, constantes: dict, default_cols: list, mensaje_fn) -> pd.DataFrame:
+    _require_pyarrow()
+    t_start = time.perf_counter()
+    df = df_campaign.rename(columns=SOURCE_COLUMNS)
+
+    required = set(SOURCE_COLUMNS.values())
+    missing = required - set(df.columns)
+    if missing:
+        raise ValueError(f"Faltan columnas requeridas en la fuente: {missing}")
+
+    table = pa.table({col: _to_arrow_text(df[col]) for col in SOURCE_COLUMNS.values()})
+    # Posición de cada fila en df, para devolver la salida con el índice original
+    table = table.append_column("POS", pa.array(np.arange(len(df), dtype=np.int64)))
+
+    # === FILTRO: quitar ANSWER ===
+    table = table.filter(pc.invert(pc.fill_null(pc.equal(pc.utf8_upper(table["RESULT"]), "ANSWER"), False)))
+    src = {col: table[col].combine_chunks() for col in table.column_names}
+
+    phone = phone_arrow(src["TELEPHONE"])
+    mensaje = mensaje_arrow(src["RESULT"], mensaje_fn)
+    fecha, n_fallback = dates_arrow(src["DATE"], src["DATE"].to_pandas())
+    if verbose:
+        print(f"FECHA GESTION: {n_fallback} de {table.num_rows} fila(s) por ruta lenta (parse_date_any)")
+    cedula = cedula_arrow(src["CUSTOMER_ID"])
+    producto = producto_arrow(cedula, multicanal_map)
+
+    # Validaciones mínimas (teléfono válido)
+    keep = pc.is_valid(phone)
+    idx = df.index[pc.filter(src["POS"], keep).to_numpy()]
+    cols = {
+        "CEDULA": pc.filter(cedula, keep),
+        "NUMERO TELEFONO": pc.filter(phone, keep),
+        "MENSAJE": pc.filter(mensaje, keep),
+        "FECHA GESTION": pc.filter(fecha, keep),
+        "NUMERO PRODUCTO": pc.filter(producto, keep),
+    }
+
+    t_final = time.perf_counter()
+    columns = {name: _to_pandas(arr).set_axis(idx) for name, arr in cols.items()}
+    for name, value in constantes.items():
+        columns[name] = constant_column(value, idx)
+
+    final_cols = resolve_output_columns(template_path, default_cols)
+    out = finalize_output(columns, idx, final_cols,
+                          trimmed={"CEDULA", "MENSAJE", "FECHA GESTION", "NUMERO PRODUCTO"})
+    t_final = time.perf_counter() - t_final
+
+    t_total = time.perf_counter() - t_start
+    if verbose:
+        print(f"Finalización salida: {t_final:.3f} s ({t_final / t_total:.0%} del transform)")
+    return out
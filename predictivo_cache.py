@@ -0,0 +1,138 @@
+"""
+Caché por etapa del pipeline predictivo (Predictivo/.cache).
+
+Cada etapa (fuente filtrada, cargue final) se guarda en Feather con una
+llave que es el hash de sus entradas: payload de la fuente, huella del
+archivo Multicanal, template y versión del código. El Multicanal map tiene
+su propio índice persistente (predictivo_multicanal.py). Si RPA_Cargue
+falla y se vuelve a correr el predictivo, las etapas cuyas entradas no
+cambiaron se leen del caché en vez de recalcularse.
+
+Las entradas se depuran por antigüedad y por tamaño total del directorio.
+Feather requiere pyarrow; sin pyarrow el caché queda deshabilitado.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (solo para saber si Feather está disponible)
+    HAS_FEATHER = True
+except ImportError:
+    HAS_FEATHER = False
+
+CACHE_SUFFIX = ".feather"
+
+# ========================= Huellas =========================
+
+def _sha256(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def file_fingerprint(path: Path) -> str:
+    """Huella barata de un archivo grande: nombre, tamaño y mtime."""
+    st = Path(path).stat()
+    return _sha256(Path(path).name, st.st_size, st.st_mtime_ns)
+
+def content_fingerprint(*paths: Path) -> str:
+    """Hash del contenido de archivos pequeños (template, código)."""
+    return _sha256(*(Path(p).read_bytes() if Path(p).exists() else b"" for p in paths))
+
+def payload_fingerprint(records) -> str:
+    """Hash del payload de la API (lista de dicts), independiente del orden de llaves."""
+    return _sha256(json.dumps(records, sort_keys=True, default=str, ensure_ascii=False))
+
+# ========================= Caché =========================
+
+class StageCache:
+    """
+    Uso:
+        cache = StageCache(PREDICTIVO_DIR / ".cache", max_age_hours=48, max_mb=500)
+        df = cache.run("fuente", [payload_fp, code_fp], lambda: filter_portafolios(...))
+    """
+
+    def __init__(self, folder: Path, max_age_hours: float, max_mb: float, enabled: bool = True):
+        self.folder = Path(folder)
+        self.max_age_s = max_age_hours * 3600
+        self.max_bytes = max_mb * 1024 * 1024
+        self.enabled = enabled and HAS_FEATHER
+        if enabled and not HAS_FEATHER:
+            print("Caché de etapas deshabilitado: requiere pyarrow para Feather")
+        if self.enabled:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            self.evict()
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.folder / f"{stage}_{key[:24]}{CACHE_SUFFIX}"
+
+    def load(self, stage: str, key: str):
+        path = self._path(stage, key)
+        if not self.enabled or not path.exists():
+            return None
+        try:
+            df = pd.read_feather(path)
+            os.utime(path)  # la depuración por tamaño borra primero lo menos usado
+        except FileNotFoundError:  # depurada por otro proceso entre exists() y la lectura
+            return None
+        except Exception as e:
+            print(f"Caché {stage}: entrada ilegible ({e}); se recalcula")
+            path.unlink(missing_ok=True)
+            return None
+        return df
+
+    def store(self, stage: str, key: str, df: pd.DataFrame):
+        if not self.enabled:
+            return
+        path = self._path(stage, key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")  # único por proceso (backfill en paralelo)
+        try:
+            df.reset_index(drop=True).to_feather(tmp)
+        except Exception as e:
+            # p.ej. columnas object con tipos mezclados que Arrow no serializa
+            print(f"Caché {stage}: no se pudo guardar ({e})")
+            tmp.unlink(missing_ok=True)
+            return
+        os.replace(tmp, path)
+        self.evict()
+
+    def run(self, stage: str, key_parts: list, fn) -> pd.DataFrame:
+        """Retorna la etapa desde el caché si sus entradas no cambiaron; si no, la calcula y la guarda."""
+        key = _sha256(stage, *key_parts)
+        t0 = time.perf_counter()
+        df = self.load(stage, key)
+        if df is not None:
+            print(f"Caché {stage}: hit ({len(df)} filas, {time.perf_counter() - t0:.2f} s)")
+            return df
+        df = fn()
+        if self.enabled:
+            print(f"Caché {stage}: miss ({time.perf_counter() - t0:.2f} s)")
+        self.store(stage, key, df)
+        return df
+
+    def evict(self):
+        """Borra entradas más viejas que max_age y luego las menos usadas hasta quedar bajo max_mb."""
+        now = time.time()
+        entries = []
+        for p in self.folder.glob(f"*{CACHE_SUFFIX}"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:  # otro proceso (p.ej. backfill) ya la depuró
+                continue
+            if now - st.st_mtime > self.max_age_s:
+                p.unlink(missing_ok=True)
+            else:
+                entries.append((st.st_mtime, st.st_size, p))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,219 @@
+"""
+Descubrimiento de los campaign_id de Wolkvox de cada portafolio.
+
+campaign_3 se pedía siempre con campaign_id=all y PROMOTORA se filtraba en
+el cliente: la respuesta traía el marcador de todas las operaciones del
+tenant por la red y por el parser de JSON. Este módulo aprende qué
+campaign_id traen registros con opt1 de cada portafolio (con cualquier
+RESULT, también ANSWER) y guarda el mapa en
+Predictivo/.campanas/campaign_ids.json, con la última vez que se vio cada
+campaign_id:
+    {"PROMOTORA": {"campaign_ids": {"12": "2026-10-16T19:06:02-05:00", "15": "2026-10-09T19:05:40-05:00"},
+                   "actualizado": "2026-10-16T19:06:02-05:00"}}
+
+- El mapa se aprende de payloads de días completos con campaign_id=all: el
+  fetch del día cuando hubo que pedir all, o python predictivo_campanas.py
+  (días guardados en el caché de respuestas o, si no hay, ayer desde la
+  API). Una ventana parcial (poll, hora suelta) no alcanza a ver todas las
+  campañas del día y no se usa: con PREDICTIVO_INGESTA=1 el mapa lo
+  refresca run_ingesta.bat antes del poller.
+- Con el mapa vigente, main_predictivo pide solo esas campañas (en
+  paralelo, una llamada por ventana y campaña).
+- Si a algún portafolio le falta el mapa, está vacío o tiene más de
+  PREDICTIVO_CAMPAIGN_IDS_REFRESH_H horas, se vuelve a campaign_id=all y el
+  mapa se reaprende de esa respuesta.
+- Al reaprender, los campaign_id del día se agregan a los que ya estaban: un
+  día sin registros de una campaña no la saca del mapa. Un campaign_id sale
+  cuando lleva PREDICTIVO_CAMPAIGN_IDS_EXPIRA_D días sin verse.
+
+Una campaña nueva de un portafolio no se ve hasta que el mapa se refresca:
+el intervalo acota esa ventana de riesgo.
+
+Uso:
+    python predictivo_campanas.py            # reaprende solo si el mapa no está vigente
+    python predictivo_campanas.py --forzar   # reaprende aunque esté vigente
+    python predictivo_campanas.py --dias 3   # días recientes del caché de respuestas a revisar
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+import predictivo_respuestas
+from predictivo_json import iter_json_records
+
+PROJECT_ROOT      = Path(__file__).resolve().parent
+CAMPAIGN_IDS_FILE = PROJECT_ROOT / "Predictivo" / ".campanas" / "campaign_ids.json"
+TZ                = ZoneInfo("America/Bogota")
+DATE_FORMAT       = "%Y%m%d%H%M%S"
+
+# Pedir solo las campañas de los portafolios (1 = activo; 0 = siempre campaign_id=all)
+ENABLED = os.getenv("PREDICTIVO_CAMPAIGN_IDS", "1").strip() != "0"
+# Horas que el mapa se considera vigente antes de volver a pedir campaign_id=all
+REFRESH_HOURS = float(os.getenv("PREDICTIVO_CAMPAIGN_IDS_REFRESH_H", "72") or 72)
+# Días sin registros tras los cuales un campaign_id sale del mapa
+EXPIRE_DAYS = float(os.getenv("PREDICTIVO_CAMPAIGN_IDS_EXPIRA_D", "14") or 14)
+
+# ========================= Mapa =========================
+
+def load_mapping() -> dict:
+    try:
+        return json.loads(CAMPAIGN_IDS_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _write_mapping(mapping: dict):
+    CAMPAIGN_IDS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CAMPAIGN_IDS_FILE.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(mapping, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, CAMPAIGN_IDS_FILE)
+
+def _seen_ids(entry: dict) -> dict:
+    """campaign_id -> última vez visto (un mapa viejo con lista de ids toma la fecha de "actualizado")."""
+    ids = entry.get("campaign_ids") or {}
+    if isinstance(ids, list):
+        return {cid: entry["actualizado"] for cid in ids}
+    return dict(ids)
+
+def _id_order(cid: str) -> tuple:
+    return len(cid), cid
+
+def is_full_day(date_ini: str, date_end: str) -> bool:
+    """True si el rango cubre un día completo (el mapa solo se aprende de días completos)."""
+    span = datetime.strptime(date_end, DATE_FORMAT) - datetime.strptime(date_ini, DATE_FORMAT)
+    return span >= timedelta(days=1, seconds=-1)
+
+def resolve_campaign_ids(opt1s: list, now: datetime = None, force: bool = False):
+    """
+    campaign_id a pedir para opt1s según el mapa, o None (= campaign_id=all)
+    si está deshabilitado, force pide reaprender o a algún portafolio le
+    falta un mapa vigente.
+    """
+    if not ENABLED or force:
+        return None
+    now = now or datetime.now(TZ)
+    mapping = load_mapping()
+    ids = set()
+    for opt1 in opt1s:
+        entry = mapping.get(opt1)
+        if not entry or not entry.get("campaign_ids"):
+            print(f"campaign_id: sin mapa para {opt1}; se pide campaign_id=all")
+            return None
+        age = now - datetime.fromisoformat(entry["actualizado"])
+        if age > timedelta(hours=REFRESH_HOURS):
+            print(f"campaign_id: mapa de {opt1} vencido ({age.total_seconds() / 3600:.0f} h); "
+                  f"se pide campaign_id=all")
+            return None
+        ids.update(_seen_ids(entry))
+    return sorted(ids, key=_id_order)
+
+def learn_campaign_ids(df: pd.DataFrame, opt1s: list, now: datetime = None) -> dict:
+    """
+    Actualiza el mapa con los pares (opt1, campaign_id) de df (payload de
+    campaign_id=all de un día completo, con todos los RESULT). Los
+    campaign_id vistos se marcan con la hora actual y se suman a los que ya
+    estaban; los que llevan más de EXPIRE_DAYS días sin verse salen. Un
+    portafolio que queda sin campaign_id conserva su entrada anterior.
+    """
+    if not ENABLED or "campaign_id" not in df.columns:
+        return {}
+    now = now or datetime.now(TZ)
+    stamp = now.isoformat(timespec="seconds")
+    opt1 = df["opt1"].astype(str).str.upper()
+    campaign_id = df["campaign_id"].where(df["campaign_id"].isna(), df["campaign_id"].astype(str))
+    mapping = load_mapping()
+    learned = {}
+    for o in opt1s:
+        seen = {cid: ts for cid, ts in _seen_ids(mapping.get(o, {})).items()
+                if now - datetime.fromisoformat(ts) <= timedelta(days=EXPIRE_DAYS)}
+        seen.update(dict.fromkeys(campaign_id[opt1.eq(o)].dropna().unique(), stamp))
+        if seen:
+            learned[o] = {"campaign_ids": {cid: seen[cid] for cid in sorted(seen, key=_id_order)},
+                          "actualizado": stamp}
+    if learned:
+        _write_mapping({**mapping, **learned})
+        for o, entry in learned.items():
+            print(f"campaign_id: mapa de {o} actualizado -> {', '.join(entry['campaign_ids'])}")
+    return learned
+
+# ========================= CLI =========================
+
+def _covers_day(day: str, windows: list) -> bool:
+    """True si las ventanas (date_ini, date_end) cubren el día YYYYMMDD completo sin huecos."""
+    cursor = datetime.strptime(day, "%Y%m%d")
+    day_end = cursor + timedelta(days=1)
+    for date_ini, date_end in sorted(windows):
+        if datetime.strptime(date_ini, DATE_FORMAT) > cursor:
+            return False
+        cursor = max(cursor, datetime.strptime(date_end, DATE_FORMAT) + timedelta(seconds=1))
+    return cursor >= day_end
+
+def cached_full_days(dias: int) -> list:
+    """
+    Respuestas campaign_id=all definitivas del caché de respuestas de los
+    últimos dias días cerrados cuyas ventanas cubren el día completo.
+    """
+    desde = (datetime.now(TZ) - timedelta(days=dias)).strftime("%Y%m%d")
+    by_day = {}
+    # "campaign_3_*" no incluye las respuestas por campaña (campaign_3-<id>_*)
+    for path in predictivo_respuestas.RESPUESTAS_DIR.glob(f"campaign_3_*{predictivo_respuestas.SUFFIX}"):
+        parts = path.name[:-len(predictivo_respuestas.SUFFIX)].split("_")
+        if len(parts) != 4:
+            continue
+        date_ini, date_end = parts[2], parts[3]
+        day = date_ini[:8]
+        # solo respuestas definitivas: una bajada con el día abierto no trae todas las campañas
+        if (day >= desde and date_end[:8] == day
+                and predictivo_respuestas.entry_is_final(path, path.stat().st_mtime)):
+            by_day.setdefault(day, {})[(date_ini, date_end)] = path
+    return [path for day, windows in sorted(by_day.items()) if _covers_day(day, list(windows))
+            for _, path in sorted(windows.items())]
+
+def learn_from_cache(paths: list, opt1s: list) -> dict:
+    """Aprende el mapa de respuestas campaign_id=all guardadas (todos los RESULT, no solo los del cargue)."""
+    keep = set(opt1s)
+    pairs = set()
+    for path in paths:
+        for rec in iter_json_records(predictivo_respuestas.read_chunks(path)):
+            if isinstance(rec, dict) and str(rec.get("opt1")).upper() in keep:
+                pairs.add((str(rec.get("opt1")).upper(), rec.get("campaign_id")))
+    df = pd.DataFrame(sorted(pairs, key=str), columns=["opt1", "campaign_id"])
+    n_days = len({p.name.split("_")[2][:8] for p in paths})
+    print(f"campaign_id: {n_days} día(s) del caché de respuestas revisados ({len(paths)} respuestas)")
+    return learn_campaign_ids(df, opt1s)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mapa opt1 -> campaign_id de Wolkvox")
+    parser.add_argument("--forzar", action="store_true", help="reaprender aunque el mapa esté vigente")
+    parser.add_argument("--dias", type=int, default=7, help="días recientes del caché de respuestas a revisar")
+    args = parser.parse_args()
+
+    import main_predictivo as mp
+    opt1s = [pf["opt1"] for pf in mp.load_portafolios()]
+    if not ENABLED:
+        print("PREDICTIVO_CAMPAIGN_IDS=0: el fetch siempre pide campaign_id=all")
+        return 0
+    if not args.forzar and resolve_campaign_ids(opt1s) is not None:
+        print(f"campaign_id: mapa vigente para {', '.join(opt1s)}")
+        return 0
+
+    paths = cached_full_days(args.dias)
+    learned = learn_from_cache(paths, opt1s) if paths else {}
+    if set(opt1s) - set(learned):
+        # sin días completos en el caché (o portafolios sin registros en ellos): ayer desde la API
+        date_ini, date_end = mp.compute_day_range_bogota(datetime.now(TZ).date() - timedelta(days=1))
+        mp.fetch_campaign3(date_ini, date_end, opt1s, force_all=True)
+
+    missing = [o for o in opt1s if not load_mapping().get(o, {}).get("campaign_ids")]
+    if missing:
+        print(f"campaign_id: sin registros para {', '.join(missing)}; el fetch seguirá con campaign_id=all")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Registro persistente de huellas de filas ya cargadas al CRM.
+
+Cada fila subida con éxito por RPA_Cargue queda registrada como un hash de
+64 bits de sus columnas de identidad (CEDULA, NUMERO TELEFONO, FECHA
+GESTION, MENSAJE) en una tabla SQLite cuya llave primaria es la huella
+(búsqueda por índice, sin escanear). main_predictivo / predictivo_sabado
+consultan el registro para emitir solo las filas que no se han cargado
+antes: si el orquestador se relanza el mismo día o Wolkvox vuelve a
+reportar los mismos intentos, esas filas no se suben otra vez.
+
+Las huellas más viejas que la ventana de retención se depuran al abrir el
+registro.
+
+Uso (inspección / mantenimiento):
+    python predictivo_huellas.py stats
+    python predictivo_huellas.py check Predictivo/cargue_predictivo_2026-10-16.csv
+    python predictivo_huellas.py purge --dias 3
+    python predictivo_huellas.py clear
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+HUELLAS_DB   = PROJECT_ROOT / "Predictivo" / ".huellas" / "cargues.sqlite"
+
+# Ventana de retención (días) de las huellas registradas
+RETENCION_DIAS = float(os.getenv("PREDICTIVO_HUELLAS_DIAS", "7") or 7)
+
+# Columnas que identifican una gestión (las constantes del CRM no aportan)
+HUELLA_COLUMNS = ["CEDULA", "NUMERO TELEFONO", "FECHA GESTION", "MENSAJE"]
+
+# ========================= Huellas =========================
+
+def row_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash int64 por fila sobre el texto de HUELLA_COLUMNS (vectorizado con
+    hash_pandas_object). Se calcula sobre el texto para que la salida del
+    transform (categóricas / Int64) y el CSV leído como str den la misma huella.
+    """
+    text = pd.DataFrame({c: df[c].astype("string").fillna("").astype(object) for c in HUELLA_COLUMNS})
+    return pd.util.hash_pandas_object(text, index=False).to_numpy().view(np.int64)
+
+# ========================= Registro SQLite =========================
+
+def connect(db_path: Path = HUELLAS_DB, retencion_dias: float = RETENCION_DIAS) -> sqlite3.Connection:
+    """Abre (o crea) el registro y depura las huellas fuera de la ventana de retención."""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA temp_store=MEMORY")
+    con.execute("CREATE TABLE IF NOT EXISTS huellas (fp INTEGER PRIMARY KEY, cargado INTEGER NOT NULL) WITHOUT ROWID")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_huellas_cargado ON huellas (cargado)")
+    purge(con, retencion_dias)
+    return con
+
+def purge(con: sqlite3.Connection, dias: float) -> int:
+    """Borra las huellas cargadas hace más de dias días. Retorna cuántas borró."""
+    limite = int(time.time() - dias * 86400)
+    with con:
+        return con.execute("DELETE FROM huellas WHERE cargado < ?", (limite,)).rowcount
+
+def seen_mask(con: sqlite3.Connection, fps: np.ndarray) -> np.ndarray:
+    """Máscara booleana: True si la huella ya está registrada."""
+    if not len(fps):
+        return np.zeros(0, dtype=bool)
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS candidatas (fp INTEGER PRIMARY KEY) WITHOUT ROWID")
+    with con:
+        con.execute("DELETE FROM candidatas")
+        con.executemany("INSERT OR IGNORE INTO candidatas VALUES (?)", ((int(fp),) for fp in np.unique(fps)))
+        seen = np.fromiter(
+            (fp for (fp,) in con.execute("SELECT c.fp FROM candidatas c JOIN huellas h ON h.fp = c.fp")),
+            dtype=np.int64,
+        )
+    return np.isin(fps, seen)
+
+def record(con: sqlite3.Connection, fps: np.ndarray) -> int:
+    """Registra huellas como cargadas ahora (si ya existían, renueva la fecha)."""
+    now = int(time.time())
+    with con:
+        con.executemany("INSERT OR REPLACE INTO huellas VALUES (?, ?)", ((int(fp), now) for fp in np.unique(fps)))
+    return len(fps)
+
+# ========================= Integración pipeline / RPA =========================
+
+def filter_unseen(out: pd.DataFrame, db_path: Path = HUELLAS_DB) -> tuple:
+    """Quita de la salida del cargue las filas ya cargadas. Retorna (salida, filas omitidas)."""
+    if out.empty:
+        return out, 0
+    con = connect(db_path)
+    try:
+        seen = seen_mask(con, row_fingerprints(out))
+    finally:
+        con.close()
+    if not seen.any():
+        return out, 0
+    return out[~seen], int(seen.sum())
+
+def record_csv(path: Path, db_path: Path = HUELLAS_DB) -> int:
+    """Registra como cargadas todas las filas de un CSV de cargue (sep=';')."""
+    df = pd.read_csv(path, sep=";", dtype=str, keep_default_na=False, encoding="utf-8")
+    if df.empty or not set(HUELLA_COLUMNS) <= set(df.columns):
+        return 0
+    con = connect(db_path)
+    try:
+        return record(con, row_fingerprints(df))
+    finally:
+        con.close()
+
+# ========================= CLI =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de huellas de filas cargadas al CRM")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="Cantidad de huellas y rango de fechas de cargue")
+    p_check = sub.add_parser("check", help="Cuántas filas de un CSV de cargue ya están registradas")
+    p_check.add_argument("csv", type=Path)
+    p_purge = sub.add_parser("purge", help="Borrar huellas más viejas que N días")
+    p_purge.add_argument("--dias", type=float, default=RETENCION_DIAS)
+    sub.add_parser("clear", help="Borrar todas las huellas")
+    args = parser.parse_args()
+
+    con = connect()
+    try:
+        if args.cmd == "stats":
+            n, first, last = con.execute("SELECT COUNT(*), MIN(cargado), MAX(cargado) FROM huellas").fetchone()
+            print(f"Registro: {HUELLAS_DB}")
+            print(f"Huellas: {n} (retención {RETENCION_DIAS:g} días)")
+            if n:
+                fmt = lambda ts: time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+                print(f"Cargadas entre {fmt(first)} y {fmt(last)}")
+        elif args.cmd == "check":
+            df = pd.read_csv(args.csv, sep=";", dtype=str, keep_default_na=False, encoding="utf-8")
+            missing = [c for c in HUELLA_COLUMNS if c not in df.columns]
+            if missing:
+                print(f"{args.csv}: faltan columnas para la huella: {', '.join(missing)}")
+                return 1
+            seen = seen_mask(con, row_fingerprints(df))
+            print(f"{args.csv}: {int(seen.sum())} de {len(df)} fila(s) ya cargadas")
+        elif args.cmd == "purge":
+            print(f"Huellas borradas: {purge(con, args.dias)}")
+        elif args.cmd == "clear":
+            with con:
+                print(f"Huellas borradas: {con.execute('DELETE FROM huellas').rowcount}")
+    finally:
+        con.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+Ingesta incremental de campaign_3 durante el día (Predictivo/ingesta/<día>/).
+
+El predictivo de las 7:05 PM traía el día completo de una vez y todo el
+costo del fetch quedaba justo antes del cargue al CRM. Con el poller, cada
+PREDICTIVO_POLL_MIN minutos se pide solo la ventana nueva y los registros
+de los portafolios (sin ANSWER) se agregan a un almacén local de solo
+escritura al final:
+    Predictivo/ingesta/<día>/parte_0001.pkl, parte_0002.pkl, ...
+    Predictivo/ingesta/<día>/watermark.json
+    Predictivo/ingesta/<día>/vistos.sqlite
+
+El watermark guarda hasta dónde se pidió (hasta), la última `date` ingerida
+y las partes confirmadas. Cada poll pide desde hasta menos
+PREDICTIVO_POLL_LAG_MIN (registros que la API publica con retraso) y
+descarta los ya vistos: las llaves (conn_id, o una huella del contenido si
+no tiene) quedan en vistos.sqlite, marcadas con la parte que las trajo, y
+cada poll solo inserta las nuevas. Una parte solo cuenta cuando el
+watermark que la lista quedó escrito: si el proceso se cae entre los dos
+pasos, la parte huérfana y sus llaves se borran y su ventana se vuelve a
+pedir.
+
+A las 7:05 PM main_predictivo (con PREDICTIVO_INGESTA=1) hace un último
+poll de los minutos que faltan y arma el cargue desde el almacén.
+
+Las partes son DataFrames en pickle: los registros de la API traen tipos
+mezclados por columna que Feather/Parquet no siempre serializan, y el
+almacén es la fuente del cargue (no se puede descartar una parte como el caché).
+
+Uso:
+    python predictivo_ingesta.py poll              # hasta PREDICTIVO_POLL_HASTA (19:00), cada PREDICTIVO_POLL_MIN
+    python predictivo_ingesta.py once              # un solo poll
+    python predictivo_ingesta.py stats [2026-10-16]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from functools import partial
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from predictivo_transform import parse_date_series
+from predictivo_wolkvox import sort_frame
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+INGESTA_DIR  = PROJECT_ROOT / "Predictivo" / "ingesta"
+TZ           = ZoneInfo("America/Bogota")
+DATE_FORMAT  = "%Y%m%d%H%M%S"
+
+# Cargue desde el almacén local (1 = activo): main_predictivo solo pide los minutos faltantes
+INGESTA_ENABLED = os.getenv("PREDICTIVO_INGESTA", "0").strip() == "1"
+# Cada cuántos minutos pide la ventana nueva el poller, y hasta qué hora (HH:MM, Bogotá)
+POLL_MINUTES = float(os.getenv("PREDICTIVO_POLL_MIN", "15") or 15)
+POLL_UNTIL   = os.getenv("PREDICTIVO_POLL_HASTA", "19:00").strip() or "19:00"
+# Margen hacia atrás de cada ventana (min) para registros publicados con retraso
+POLL_LAG_MINUTES = float(os.getenv("PREDICTIVO_POLL_LAG_MIN", "15") or 0)
+# Días de ingesta que se conservan
+INGESTA_DIAS = int(os.getenv("PREDICTIVO_INGESTA_DIAS", "7") or 7)
+
+# ========================= Almacén =========================
+
+def day_dir(day: date) -> Path:
+    return INGESTA_DIR / day.isoformat()
+
+def load_watermark(day: date):
+    """Watermark del día, o None si todavía no hay ingesta."""
+    try:
+        return json.loads((day_dir(day) / "watermark.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+def _write_watermark(day: date, watermark: dict):
+    path = day_dir(day) / "watermark.json"
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(watermark, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _new_watermark(day: date, opt1s: list) -> dict:
+    return {"dia": day.isoformat(), "opt1s": sorted(opt1s), "ultima_fecha": None,
+            "hasta": None, "partes": [], "filas": 0}
+
+def _connect_vistos(day: date) -> sqlite3.Connection:
+    """Llaves ya guardadas del día (llave -> parte que la trajo), como el registro de predictivo_huellas."""
+    con = sqlite3.connect(day_dir(day) / "vistos.sqlite")
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA temp_store=MEMORY")
+    con.execute("CREATE TABLE IF NOT EXISTS vistos (llave TEXT PRIMARY KEY, parte TEXT NOT NULL) WITHOUT ROWID")
+    return con
+
+def _seen_mask(con: sqlite3.Connection, keys: pd.Series) -> pd.Series:
+    """Máscara booleana: True si la llave ya está en vistos."""
+    if not len(keys):
+        return pd.Series(False, index=keys.index)
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS candidatas (llave TEXT PRIMARY KEY) WITHOUT ROWID")
+    with con:
+        con.execute("DELETE FROM candidatas")
+        con.executemany("INSERT OR IGNORE INTO candidatas VALUES (?)", ((k,) for k in keys.unique()))
+        seen = [k for (k,) in con.execute("SELECT c.llave FROM candidatas c JOIN vistos v ON v.llave = c.llave")]
+    return keys.isin(seen)
+
+def _record_keys(con: sqlite3.Connection, keys, parte: str):
+    with con:
+        con.executemany("INSERT OR IGNORE INTO vistos VALUES (?, ?)", ((k, parte) for k in keys))
+
+def _open_store(day: date, opt1s: list) -> dict:
+    """Watermark vigente para opt1s; si cambiaron los portafolios el almacén del día se reinicia."""
+    watermark = load_watermark(day)
+    if watermark is not None and watermark["opt1s"] != sorted(opt1s):
+        print(f"Ingesta {day}: los portafolios cambiaron ({', '.join(watermark['opt1s'])} -> "
+              f"{', '.join(sorted(opt1s))}); se reinicia el almacén del día")
+        watermark = None
+    if watermark is None:
+        shutil.rmtree(day_dir(day), ignore_errors=True)
+        day_dir(day).mkdir(parents=True, exist_ok=True)
+        watermark = _new_watermark(day, opt1s)
+
+    # partes (y sus llaves) que no alcanzaron a quedar en el watermark (caída a mitad de un poll)
+    for part in day_dir(day).glob("parte_*"):
+        if part.name not in watermark["partes"]:
+            part.unlink(missing_ok=True)
+    with closing(_connect_vistos(day)) as con:
+        partes = {p for (p,) in con.execute("SELECT DISTINCT parte FROM vistos")}
+        with con:
+            con.executemany("DELETE FROM vistos WHERE parte = ?",
+                            ((p,) for p in partes - set(watermark["partes"])))
+        # watermark anterior con las llaves en listas: pasan a vistos
+        old_keys = watermark.pop("conn_ids", []) + ["contenido:" + k for k in watermark.pop("sin_conn_id", [])]
+        if old_keys and watermark["partes"]:
+            _record_keys(con, old_keys, watermark["partes"][-1])
+            _write_watermark(day, watermark)
+    return watermark
+
+def store_fingerprint(watermark: dict) -> str:
+    """Huella del almacén: las partes son inmutables, así que basta con el watermark."""
+    fields = {k: watermark.get(k) for k in ("dia", "opt1s", "partes", "filas", "ultima_fecha")}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_store(day: date, opt1s: list):
+    """
+    Registros ingeridos del día como un DataFrame (partes en orden), o None
+    si no hay ingesta para esos portafolios. attrs["payload_fp"] identifica
+    el contenido del almacén (llave del caché).
+    """
+    watermark = load_watermark(day)
+    if watermark is None or watermark["opt1s"] != sorted(opt1s) or not watermark["partes"]:
+        return None
+    parts = [pd.read_pickle(day_dir(day) / name) for name in watermark["partes"]]
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    # un registro publicado con retraso llega en una parte posterior: mismo orden que el fetch del día
+    df = sort_frame(df)
+    df.attrs = {"payload_fp": store_fingerprint(watermark),
+                "leidos": watermark["filas"], "conservados": len(df), "duplicados": 0}
+    return df
+
+def purge_old(keep_days: int = INGESTA_DIAS, today: date = None):
+    today = today or datetime.now(TZ).date()
+    if not INGESTA_DIR.exists():
+        return
+    for folder in INGESTA_DIR.iterdir():
+        try:
+            folder_day = date.fromisoformat(folder.name)
+        except ValueError:
+            continue
+        if (today - folder_day).days >= keep_days:
+            shutil.rmtree(folder, ignore_errors=True)
+
+# ========================= Poll =========================
+
+def _content_keys(df: pd.DataFrame) -> pd.Series:
+    """Huella sha1 del contenido de cada fila (para registros sin conn_id, que no tienen otra llave)."""
+    return pd.Series([hashlib.sha1(json.dumps(rec, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+                      for rec in df.to_dict("records")], index=df.index, dtype=object)
+
+def next_window(day: date, watermark: dict, now: datetime) -> tuple:
+    """
+    (date_ini, date_end) del próximo poll: desde donde terminó el anterior
+    (hasta) menos el margen, hasta ahora. No se parte de la última date
+    guardada: tras un rato sin registros de los portafolios (o solo con
+    ANSWER) cada poll volvería a pedir todo lo posterior.
+    """
+    day_start = datetime(day.year, day.month, day.day)
+    day_end = day_start + timedelta(days=1, seconds=-1)
+    start = day_start
+    if watermark["hasta"]:
+        start = max(day_start, datetime.strptime(watermark["hasta"], DATE_FORMAT) - timedelta(minutes=POLL_LAG_MINUTES))
+    end = min(day_end, now.replace(tzinfo=None, microsecond=0))
+    return start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)
+
+def poll_once(day: date, opt1s: list, fetch_window, now: datetime = None) -> int:
+    """
+    Pide la ventana nueva con fetch_window(date_ini, date_end, opt1s) ->
+    DataFrame filtrado (fetch_campaign3 de main_predictivo), guarda como una
+    parte nueva los registros cuyo conn_id (o, sin conn_id, cuyo contenido)
+    no estaba en vistos y avanza el watermark.
+    Retorna las filas agregadas.
+    """
+    t0 = time.perf_counter()
+    watermark = _open_store(day, opt1s)
+    date_ini, date_end = next_window(day, watermark, now or datetime.now(TZ))
+    df = fetch_window(date_ini, date_end, opt1s)
+
+    keys = None
+    with closing(_connect_vistos(day)) as con:
+        if len(df) and "conn_id" in df.columns:
+            conn_id = df["conn_id"].where(df["conn_id"].isna(), df["conn_id"].astype(str))
+            # sin conn_id la llave es el contenido: el margen de retraso los vuelve a traer
+            no_id = conn_id.isna()
+            keys = conn_id.copy()
+            if no_id.any():
+                keys[no_id] = "contenido:" + _content_keys(df[no_id])
+            new = ~_seen_mask(con, keys) & ~keys.duplicated()
+            df = df[new].reset_index(drop=True)
+            keys = keys[new]
+
+        if len(df):
+            ultima = parse_date_series(df["date"])[0].max() if "date" in df.columns else pd.NaT
+            if pd.notna(ultima) and (not watermark["ultima_fecha"]
+                                     or ultima > datetime.fromisoformat(watermark["ultima_fecha"])):
+                watermark["ultima_fecha"] = ultima.isoformat(sep=" ")
+
+            name = f"parte_{len(watermark['partes']) + 1:04d}.pkl"
+            tmp = day_dir(day) / f"{name}.{os.getpid()}.tmp"
+            df.to_pickle(tmp)
+            os.replace(tmp, day_dir(day) / name)
+            watermark["partes"].append(name)
+            watermark["filas"] += len(df)
+            if keys is not None:
+                _record_keys(con, keys, name)
+
+    watermark["hasta"] = date_end
+    _write_watermark(day, watermark)
+    print(f"Ingesta {day}: ventana {date_ini} -> {date_end}, {len(df)} registro(s) nuevos "
+          f"({watermark['filas']} en {len(watermark['partes'])} parte(s), "
+          f"{time.perf_counter() - t0:.1f} s)")
+    return len(df)
+
+def catch_up(day: date, opt1s: list, fetch_window, now: datetime = None) -> pd.DataFrame:
+    """Último poll del día (solo los minutos desde el watermark) y el almacén completo como fuente del cargue."""
+    poll_once(day, opt1s, fetch_window, now)
+    df = load_store(day, opt1s)
+    if df is None:
+        df = pd.DataFrame()
+        df.attrs["payload_fp"] = store_fingerprint(load_watermark(day))
+    return df
+
+# ========================= CLI =========================
+
+def _poll_until(until: str) -> datetime:
+    hh, mm = (int(x) for x in until.split(":"))
+    return datetime.now(TZ).replace(hour=hh, minute=mm, second=0, microsecond=0)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ingesta incremental de campaign_3")
+    parser.add_argument("cmd", choices=["poll", "once", "stats"])
+    parser.add_argument("dia", nargs="?", type=date.fromisoformat, help="día (YYYY-MM-DD, solo stats)")
+    parser.add_argument("--cada", type=float, default=POLL_MINUTES, help="minutos entre polls")
+    parser.add_argument("--hasta", default=POLL_UNTIL, help="hora de fin del poller (HH:MM, Bogotá)")
+    args = parser.parse_args()
+
+    if args.cmd == "stats":
+        day = args.dia or datetime.now(TZ).date()
+        watermark = load_watermark(day)
+        if watermark is None:
+            print(f"Sin ingesta para {day}")
+            return 1
+        print(f"Ingesta {day}: {watermark['filas']} registro(s) en {len(watermark['partes'])} parte(s), "
+              f"portafolios {', '.join(watermark['opt1s'])}, última date {watermark['ultima_fecha']}, "
+              f"pedido hasta {watermark['hasta']}")
+        return 0
+
+    import main_predictivo as mp
+    opt1s = [pf["opt1"] for pf in mp.load_portafolios()]
+    fetch_window = partial(mp.fetch_campaign3, stream=True)
+    purge_old()
+
+    if args.cmd == "once":
+        poll_once(datetime.now(TZ).date(), opt1s, fetch_window)
+        return 0
+
+    until = _poll_until(args.hasta)
+    print(f"Poller campaign_3: cada {args.cada:g} min hasta {args.hasta} ({', '.join(opt1s)})")
+    while True:
+        t0 = time.monotonic()
+        try:
+            poll_once(datetime.now(TZ).date(), opt1s, fetch_window)
+        except Exception as e:
+            # un poll fallido no detiene el poller: el siguiente pide desde el mismo watermark
+            print(f"[WARN] Poll fallido: {type(e).__name__}: {e}")
+        wait = args.cada * 60 - (time.monotonic() - t0)
+        if datetime.now(TZ) + timedelta(seconds=max(wait, 0)) >= until:
+            break
+        time.sleep(max(wait, 0))
+    print("Poller terminado")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Lectura incremental del JSON de campaign_3 (Wolkvox) con filtro en vuelo.
+
+El reporte de campaign_3 con campaign_id=all trae todas las campañas del
+tenant. En vez de resp.json() (bytes + texto + un dict por registro del día
+completo en memoria) la respuesta se decodifica por bloques: cada registro
+se parsea con el scanner C de json (raw_decode), se filtra por opt1 /
+RESULT apenas se lee y, si sobrevive, sus campos van a una lista por
+columna. Del payload completo solo queda en memoria el registro que se está
+leyendo y las columnas de los que pasaron el filtro.
+
+La lista de registros se ubica igual que en fetch_campaign3_json: el JSON
+puede ser una lista, o un objeto con la lista en "data" / "result" /
+"results" / "items" (o, si no, en el primer valor que sea lista); un objeto
+sin listas es un único registro.
+"""
+import codecs
+import hashlib
+import json
+import re
+
+import pandas as pd
+
+LIST_KEYS = ("data", "result", "results", "items")
+
+_WS = re.compile(r"[ \t\n\r]*")
+_SEPARATOR = re.compile(r"[ \t\n\r]*,[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+_MISSING = float("nan")
+
+# ========================= Parser incremental =========================
+
+class _JsonStream:
+    """Búfer de texto sobre bloques de bytes UTF-8, con lectura de valores JSON completos."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Agrega el siguiente bloque al búfer (descartando lo ya consumido); False al final del stream."""
+        while not self.eof:
+            chunk = next(self._chunks, None)
+            text = self._decoder.decode(b"" if chunk is None else chunk, final=chunk is None)
+            self.eof = chunk is None
+            if text:
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return True
+        return False
+
+    def peek(self) -> str:
+        """Siguiente carácter que no es espacio ("" al final del stream), sin consumirlo."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise ValueError(f"JSON inválido: se esperaba '{ch}' en la posición {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Parsea el valor JSON que empieza en la posición actual."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # valor cortado al final del búfer: se pide otro bloque y se reintenta
+                if self._fill():
+                    continue
+                raise
+            # un número que termina justo al final del búfer podría seguir en el próximo bloque
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        """Valores de la lista que empieza en la posición actual, uno a la vez."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        decode, separator = _DECODER.raw_decode, _SEPARATOR.match
+        while True:
+            # camino rápido: el valor completo ya está en el búfer y le sigue ","
+            try:
+                value, end = decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                value = self.value()
+            else:
+                if end == len(self.buf) and not self.eof:
+                    value = self.value()
+                else:
+                    self.pos = end
+            yield value
+            sep = separator(self.buf, self.pos)
+            if sep:
+                self.pos = sep.end()
+                continue
+            c = self.peek()
+            self.pos += 1
+            if c == "]":
+                return
+            if c != ",":
+                raise ValueError(f"JSON inválido: se esperaba ',' o ']' en la posición {self.pos - 1}")
+
+def iter_json_records(chunks, list_keys: tuple = LIST_KEYS):
+    """
+    Registros de la respuesta, uno a la vez, a partir de sus bloques de bytes.
+    Si hay varias listas con llave de list_keys se toma la primera que
+    aparece en el documento.
+    """
+    stream = _JsonStream(chunks)
+    first = stream.peek()
+    if first == "[":
+        yield from stream.iter_array()
+        return
+    if first != "{":
+        raise ValueError("Respuesta JSON no reconocida.")
+
+    stream.expect("{")
+    fields = {}
+    fallback = None
+    found = False
+    while stream.peek() != "}":
+        if fields or found:
+            stream.expect(",")
+        key = stream.value()
+        stream.expect(":")
+        if not found and key in list_keys and stream.peek() == "[":
+            found = True
+            yield from stream.iter_array()
+            continue
+        value = stream.value()
+        if fallback is None and isinstance(value, list):
+            fallback = value
+        fields[key] = value
+    stream.expect("}")
+
+    if found:
+        return
+    if fallback is not None:
+        yield from fallback
+        return
+    yield fields
+
+# ========================= Buffers por columna =========================
+
+class ColumnBuffers:
+    """
+    Registros acumulados como una lista por campo (sin un dict por fila).
+    Las columnas quedan en el orden en que aparece cada campo por primera
+    vez y los campos ausentes en un registro quedan en NaN (un null
+    explícito queda en None), igual que pd.DataFrame(lista de dicts).
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.rows = 0
+        # llaves del último registro y los append de sus columnas: los
+        # registros de la API casi siempre traen los mismos campos en el mismo orden
+        self._keys = None
+        self._appends = ()
+
+    def append(self, record: dict):
+        keys = tuple(record)
+        if keys == self._keys:
+            for add, value in zip(self._appends, record.values()):
+                add(value)
+            self.rows += 1
+            return
+
+        n = self.rows
+        for key, value in record.items():
+            col = self.columns.get(key)
+            if col is None:
+                col = self.columns[key] = [_MISSING] * n
+            col.append(value)
+        self.rows = n + 1
+        if len(record) != len(self.columns):
+            for col in self.columns.values():
+                if len(col) == n:
+                    col.append(_MISSING)
+            self._keys = None
+        else:
+            self._keys = keys
+            self._appends = [self.columns[key].append for key in keys]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns) if self.rows else pd.DataFrame()
+
+def _hashed(chunks, h):
+    for chunk in chunks:
+        h.update(chunk)
+        yield chunk
+
+def campaign_frame(chunks, opt1s, drop_results: tuple = ("ANSWER",)) -> pd.DataFrame:
+    """
+    DataFrame con los registros cuyo opt1 está en opt1s y cuyo RESULT no
+    está en drop_results (misma normalización que filter_portafolios y el
+    filtro de ANSWER del transform: str(valor).upper()).
+    En attrs quedan "payload_fp" (SHA-256 de los bytes recibidos, llave del
+    caché), "leidos", "conservados" y "campanas": los pares (opt1,
+    campaign_id) de los portafolios vistos antes del filtro de RESULT (una
+    campaña con solo ANSWER también cuenta para predictivo_campanas).
+    """
+    keep_opt1 = {str(o).upper() for o in opt1s}
+    drop = {str(r).upper() for r in drop_results}
+    h = hashlib.sha256()
+    buffers = ColumnBuffers()
+    campanas = set()
+    leidos = 0
+    for record in iter_json_records(_hashed(chunks, h)):
+        leidos += 1
+        if not isinstance(record, dict):
+            continue
+        opt1 = str(record.get("opt1")).upper()
+        if opt1 not in keep_opt1:
+            continue
+        if record.get("campaign_id") is not None:
+            campanas.add((opt1, str(record["campaign_id"])))
+        if str(record.get("result")).upper() in drop:
+            continue
+        buffers.append(record)
+
+    df = buffers.to_frame()
+    df.attrs.update(payload_fp=h.hexdigest(), leidos=leidos, conservados=buffers.rows,
+                    campanas=sorted(campanas))
+    return df
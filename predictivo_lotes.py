@@ -0,0 +1,129 @@
+"""
+División del cargue predictivo en lotes para RPA_Cargue.
+
+RPA_Cargue.get_files_flexible sube, en orden, los archivos *_lote_### de
+Predictivo/lotes/ cuando existen. Este módulo los genera a partir de la
+salida del transform (o de un CSV ya escrito, en modo streaming) con un
+tamaño fijo o ajustado automáticamente según el historial de cargues.
+
+Tamaño automático: RPA_Cargue registra en Logs/cargues_log.csv las filas y
+los segundos de cada archivo subido. Con esas observaciones se ajusta
+segundos ≈ a + b * filas y se elige el tamaño que deja cada cargue en una
+fracción segura del timeout del CRM. Si hubo timeouts, el tamaño queda por
+debajo del menor lote que falló.
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+LOTES_DIR    = PROJECT_ROOT / "Predictivo" / "lotes"
+CARGUES_LOG  = PROJECT_ROOT / "Logs" / "cargues_log.csv"
+
+CARGUE_TIMEOUT_S = 240      # mismo valor que TIMEOUT_CARGUE_SEGUNDOS de RPA_Cargue.py
+LOTE_MARGEN      = 0.6      # fracción del timeout a la que apunta cada lote
+LOTE_ROWS_DEFAULT = 20_000  # sin historial suficiente
+LOTE_ROWS_MIN     = 1_000
+LOTE_ROWS_MAX     = 200_000
+
+_LOG_METRICS_RE = re.compile(r"filas=(\d+).*?segundos=([\d.]+)")
+
+# ========================= Tamaño de lote =========================
+
+def upload_history(log_path: Path = CARGUES_LOG) -> pd.DataFrame:
+    """
+    Observaciones (filas, segundos, ok) de los cargues PREDICTIVO registrados
+    por RPA_Cargue (detalle "... filas=N segundos=S"); ok=False son timeouts.
+    """
+    empty = pd.DataFrame({"filas": pd.Series(dtype="int64"), "segundos": pd.Series(dtype="float64"),
+                          "ok": pd.Series(dtype=bool)})
+    if not log_path.exists():
+        return empty
+    log = pd.read_csv(log_path, sep=";", dtype=str, keep_default_na=False, on_bad_lines="skip")
+    if not {"tipo", "status", "detalle"} <= set(log.columns):
+        return empty
+
+    # errores que no son timeout no dicen nada del tamaño del archivo
+    timeout = log["status"].eq("ERROR") & log["detalle"].str.contains("timeout", case=False)
+    log = log[log["tipo"].eq("PREDICTIVO") & (log["status"].eq("OK") | timeout)]
+    metrics = log["detalle"].str.extract(_LOG_METRICS_RE).dropna()
+    return pd.DataFrame({
+        "filas": metrics[0].astype(int),
+        "segundos": metrics[1].astype(float),
+        "ok": log.loc[metrics.index, "status"].eq("OK"),
+    }).reset_index(drop=True)
+
+def auto_lote_rows(log_path: Path = CARGUES_LOG, timeout_s: float = CARGUE_TIMEOUT_S) -> int:
+    """Tamaño de lote a partir del historial; LOTE_ROWS_DEFAULT si no hay datos suficientes."""
+    hist = upload_history(log_path)
+    ok = hist[hist["ok"]]
+    target = timeout_s * LOTE_MARGEN
+
+    rows = LOTE_ROWS_DEFAULT
+    if ok["filas"].nunique() >= 2:
+        b, a = np.polyfit(ok["filas"].to_numpy(float), ok["segundos"].to_numpy(float), 1)
+        if b > 0:
+            rows = int((target - max(a, 0.0)) / b)
+    elif len(ok):
+        # una sola talla observada: escalar proporcionalmente
+        per_row = (ok["segundos"] / ok["filas"].clip(lower=1)).median()
+        if per_row > 0:
+            rows = int(target / per_row)
+
+    failed = hist.loc[~hist["ok"], "filas"]
+    if len(failed):
+        rows = min(rows, int(failed.min() * 0.8))
+    return int(np.clip(rows, LOTE_ROWS_MIN, LOTE_ROWS_MAX))
+
+def resolve_lote_rows(setting: str) -> int:
+    """PREDICTIVO_LOTE_ROWS: "0"/"" = sin lotes, "auto" = según historial, N = filas por lote."""
+    setting = (setting or "").strip().lower()
+    if setting == "auto":
+        return auto_lote_rows()
+    return int(setting or 0)
+
+# ========================= Escritura =========================
+
+def _clear_lotes(stem: str, lotes_dir: Path):
+    # lotes de una corrida anterior del mismo día: la salida nueva los reemplaza
+    for old in lotes_dir.glob(f"{stem}_lote_*.csv"):
+        old.unlink()
+
+def _write_lote(part: pd.DataFrame, path: Path) -> Path:
+    part.to_csv(path, index=False, encoding="utf-8", sep=";")
+    return path
+
+def write_lotes(out: pd.DataFrame, output_file: Path, lote_rows: int,
+                lotes_dir: Path = LOTES_DIR) -> list:
+    """
+    Escribe out en lotes_dir como <stem>_lote_001.csv, _lote_002.csv, ...
+    (hasta lote_rows filas cada uno, con header), uno tras otro: to_csv
+    formatea en Python con el GIL tomado, así que escribir con hilos no
+    adelantaba nada. Retorna las rutas en orden.
+    """
+    lotes_dir.mkdir(parents=True, exist_ok=True)
+    _clear_lotes(output_file.stem, lotes_dir)
+
+    starts = range(0, max(len(out), 1), lote_rows)
+    paths = [lotes_dir / f"{output_file.stem}_lote_{i:03d}.csv" for i in range(1, len(starts) + 1)]
+    return [_write_lote(out.iloc[s:s + lote_rows], dest) for s, dest in zip(starts, paths)]
+
+def split_csv_file(path: Path, lote_rows: int, lotes_dir: Path = LOTES_DIR) -> list:
+    """
+    Parte un CSV de cargue ya escrito (modo streaming) en lotes, leyéndolo
+    por bloques de lote_rows filas como texto (cada bloque se escribe antes
+    de leer el siguiente), y borra el archivo original (si no tiene filas se
+    deja tal cual y no se generan lotes).
+    """
+    lotes_dir.mkdir(parents=True, exist_ok=True)
+    _clear_lotes(path.stem, lotes_dir)
+
+    reader = pd.read_csv(path, sep=";", dtype=str, keep_default_na=False,
+                         encoding="utf-8", chunksize=lote_rows)
+    paths = [_write_lote(part, lotes_dir / f"{path.stem}_lote_{i:03d}.csv")
+             for i, part in enumerate(reader, start=1)]
+    if paths:
+        path.unlink()
+    return paths
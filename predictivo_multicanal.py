@@ -0,0 +1,226 @@
+"""
+Índice persistente del Multicanal: CEDULA -> NUMERO PRODUCTO.
+
+El export del Multicanal solo cambia cuando RPA_descargue_multicanal.py baja
+uno nuevo, pero main_predictivo / predictivo_sabado lo parseaban, limpiaban
+y deduplicaban en cada corrida. El map resultante se guarda en Parquet en
+Multicanal/.index/ junto con la huella del CSV de origen (tamaño, mtime y
+SHA-256 del contenido):
+- tamaño y mtime iguales: el índice se usa tal cual (se lee en milisegundos)
+- mismo tamaño y otro mtime (archivo copiado o re-descargado): decide el SHA-256
+- cualquier otro cambio, o cambio en el código que arma el map: se reconstruye
+
+RPA_descargue_multicanal.py construye el índice justo después de la
+descarga, así que el paso del predictivo normalmente solo lo lee. Requiere
+pyarrow (Parquet); sin pyarrow el map se arma en cada corrida como antes.
+
+Uso:
+    python predictivo_multicanal.py                                # índice del último CSV de Multicanal/
+    python predictivo_multicanal.py Multicanal/multicanal_2026-10-16.csv
+"""
+import codecs
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from predictivo_transform import clean_cedula_series, compact_id_series, index_multicanal_map
+from predictivo_cache import content_fingerprint
+
+try:
+    import pyarrow  # noqa: F401  (solo para saber si Parquet está disponible)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+PROJECT_ROOT   = Path(__file__).resolve().parent
+MULTICANAL_DIR = PROJECT_ROOT / "Multicanal"
+INDEX_DIRNAME  = ".index"
+INDEX_NAME     = "multicanal_map"
+
+MULTI_COL_ID   = "Número Identificación"
+MULTI_COL_PROD = "Numero producto"
+
+# Lectura del export: la codificación se decide con una muestra de bytes del
+# inicio y solo se parsean las dos columnas que se usan (parser C o pyarrow)
+ENCODING_SAMPLE_BYTES = 1 << 20
+# Parser C con memory_map (1 = activo): evita copiar el archivo a búferes propios
+MULTICANAL_MMAP = os.getenv("PREDICTIVO_MULTICANAL_MMAP", "0").strip() == "1"
+
+# Índice persistente (1 = activo); con 0 el map se arma desde el CSV en cada corrida
+INDEX_ENABLED = os.getenv("PREDICTIVO_MULTICANAL_INDEX", "1").strip() != "0"
+
+# Versión del código que arma el map: si cambia, los índices guardados se descartan
+INDEX_VERSION = content_fingerprint(Path(__file__).resolve(), PROJECT_ROOT / "predictivo_transform.py")
+
+# ========================= Map =========================
+
+def sniff_encoding(path: Path, sample_bytes: int = ENCODING_SAMPLE_BYTES) -> str:
+    """Codificación del export: utf-8 si la muestra inicial es UTF-8 válido (un carácter cortado al final no cuenta), si no latin-1."""
+    with open(path, "rb") as f:
+        sample = f.read(sample_bytes)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return "latin-1"
+    return "utf-8"
+
+def read_multicanal_csv(path: Path, engine: str = "c", memory_map: bool = MULTICANAL_MMAP) -> pd.DataFrame:
+    """
+    Lee del export solo MULTI_COL_ID y MULTI_COL_PROD (como texto) con el
+    parser C o pyarrow, en la codificación detectada por sniff_encoding. Si
+    la muestra era UTF-8 pero más adelante aparece un byte que no lo es, se
+    relee como latin-1 (igual que antes). Si falta alguna de las dos
+    columnas no se proyecta y build_multicanal_map reporta cuál.
+    """
+    encoding = sniff_encoding(path)
+    options = {"sep": ";", "dtype": str, "engine": engine}
+    if engine == "c":
+        options["memory_map"] = memory_map
+
+    def read(enc: str) -> pd.DataFrame:
+        header = pd.read_csv(path, sep=";", nrows=0, encoding=enc).columns
+        usecols = [c for c in header if c in (MULTI_COL_ID, MULTI_COL_PROD)]
+        return pd.read_csv(path, encoding=enc, usecols=usecols, **options)
+
+    try:
+        return read(encoding)
+    except UnicodeDecodeError:
+        return read("latin-1")
+
+def build_multicanal_map(df_multi: pd.DataFrame) -> pd.DataFrame:
+    if MULTI_COL_ID not in df_multi.columns:
+        raise ValueError(f"Multicanal: no existe la columna obligatoria '{MULTI_COL_ID}'")
+    if MULTI_COL_PROD not in df_multi.columns:
+        raise ValueError(f"Multicanal: no existe la columna obligatoria '{MULTI_COL_PROD}'")
+
+    tmp = df_multi[[MULTI_COL_ID, MULTI_COL_PROD]].copy()
+    tmp.columns = ["CEDULA", "NUMERO PRODUCTO"]
+
+    tmp["CEDULA"] = clean_cedula_series(tmp["CEDULA"])
+    tmp["NUMERO PRODUCTO"] = tmp["NUMERO PRODUCTO"].astype(str).str.strip().fillna("")
+
+    tmp = tmp[tmp["CEDULA"].ne("")]
+    tmp = tmp.drop_duplicates(subset=["CEDULA"], keep="last")
+
+    # Esquema compacto: CEDULA Int64 (o texto) como índice de lookup y
+    # NUMERO PRODUCTO codificado por diccionario
+    tmp["CEDULA"] = compact_id_series(tmp["CEDULA"])
+    return index_multicanal_map(tmp)
+
+# ========================= Índice =========================
+
+def file_sha256(path: Path, block: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def index_paths(csv_path: Path) -> tuple:
+    """(parquet, meta) del índice de la carpeta del CSV: <carpeta>/.index/multicanal_map.*"""
+    folder = Path(csv_path).parent / INDEX_DIRNAME
+    return folder / f"{INDEX_NAME}.parquet", folder / f"{INDEX_NAME}.json"
+
+def _write_atomic(path: Path, write_fn):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")  # único por proceso (backfill en paralelo)
+    try:
+        write_fn(tmp)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, path)
+
+def _write_meta(meta_path: Path, meta: dict):
+    _write_atomic(meta_path, lambda p: p.write_text(json.dumps(meta, indent=2), encoding="utf-8"))
+
+def load_index(csv_path: Path):
+    """Map guardado para csv_path, o None si no hay índice vigente para ese archivo."""
+    if not (INDEX_ENABLED and HAS_PARQUET):
+        return None
+    parquet_path, meta_path = index_paths(csv_path)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        st = Path(csv_path).stat()
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("version") != INDEX_VERSION or meta.get("size") != st.st_size:
+        return None
+    if meta.get("mtime_ns") != st.st_mtime_ns:
+        # mismo tamaño y otro mtime: solo se reutiliza si el contenido es el mismo
+        if file_sha256(csv_path) != meta.get("sha256"):
+            return None
+        meta["mtime_ns"] = st.st_mtime_ns
+        _write_meta(meta_path, meta)
+
+    try:
+        return index_multicanal_map(pd.read_parquet(parquet_path))
+    except Exception as e:
+        print(f"Índice Multicanal ilegible ({e}); se reconstruye")
+        return None
+
+def build_index(csv_path: Path, engine: str = "c") -> pd.DataFrame:
+    """Arma el map desde el CSV y, si el índice está activo, lo guarda en Multicanal/.index/."""
+    t0 = time.perf_counter()
+    csv_path = Path(csv_path)
+    # huella antes de leer: si el archivo cambia durante la lectura, el próximo load no coincide
+    st = csv_path.stat()
+    sha256 = file_sha256(csv_path)
+    multicanal_map = build_multicanal_map(read_multicanal_csv(csv_path, engine))
+
+    if INDEX_ENABLED and HAS_PARQUET:
+        parquet_path, meta_path = index_paths(csv_path)
+        parquet_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            _write_atomic(parquet_path, lambda p: multicanal_map.reset_index().to_parquet(p, index=False))
+            _write_meta(meta_path, {
+                "archivo": csv_path.name,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": sha256,
+                "version": INDEX_VERSION,
+                "filas": len(multicanal_map),
+            })
+        except Exception as e:
+            # p.ej. NUMERO PRODUCTO con tipos que Parquet no serializa: se sigue sin índice
+            print(f"Índice Multicanal: no se pudo guardar ({e})")
+        else:
+            print(f"Índice Multicanal construido: {len(multicanal_map)} CEDULA "
+                  f"({time.perf_counter() - t0:.2f} s) -> {parquet_path}")
+    elif INDEX_ENABLED:
+        print("Índice Multicanal deshabilitado: requiere pyarrow para Parquet")
+    return multicanal_map
+
+def load_or_build_index(csv_path: Path, engine: str = "c") -> pd.DataFrame:
+    """Map CEDULA -> NUMERO PRODUCTO de csv_path: desde el índice si está vigente, si no se construye."""
+    t0 = time.perf_counter()
+    multicanal_map = load_index(csv_path)
+    if multicanal_map is not None:
+        print(f"Índice Multicanal: hit ({len(multicanal_map)} CEDULA, {time.perf_counter() - t0:.3f} s)")
+        return multicanal_map
+    return build_index(csv_path, engine)
+
+# ========================= CLI =========================
+
+def main():
+    if len(sys.argv) > 1:
+        csv_path = Path(sys.argv[1])
+    else:
+        files = list(MULTICANAL_DIR.glob("*.csv")) if MULTICANAL_DIR.exists() else []
+        if not files:
+            print(f"No se encontró ningún .csv en: {MULTICANAL_DIR}")
+            return 1
+        csv_path = max(files, key=lambda p: p.stat().st_mtime)
+    if not (INDEX_ENABLED and HAS_PARQUET):
+        print("Índice Multicanal deshabilitado (PREDICTIVO_MULTICANAL_INDEX=0 o sin pyarrow)")
+        return 1
+    build_index(csv_path)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
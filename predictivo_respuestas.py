@@ -0,0 +1,170 @@
+"""
+Caché de respuestas crudas de Wolkvox (Predictivo/.respuestas).
+
+Cada reintento de main_predictivo (manual o del orquestador) volvía a pedir
+a reports_manager.php las mismas ventanas: minutos de descarga y cuota de
+la API. La respuesta de cada llamada se guarda tal cual llegó, comprimida
+con gzip, con llave (api, date_ini, date_end):
+    Predictivo/.respuestas/campaign_3_20261016000000_20261016005959.json.gz
+
+- Respuestas definitivas: descargadas (mtime, hora Bogotá) después del fin
+  del día de la ventana más PREDICTIVO_RESPUESTAS_LAG_MIN (registros que la
+  API publica con retraso). No expiran.
+- Las demás (una ventana de ayer bajada ayer a las 7:05 PM solo tiene lo
+  publicado hasta ese momento) expiran a los PREDICTIVO_RESPUESTAS_TTL_MIN
+  minutos de descargadas, aunque el día ya haya cerrado.
+- Tamaño total acotado (PREDICTIVO_RESPUESTAS_MAX_MB): se borran primero las
+  más viejas. Los hits no tocan el mtime: es la hora de descarga.
+
+La respuesta se comprime mientras se parsea (no se junta en memoria) y solo
+se guarda si el parseo terminó bien: un cuerpo cortado o con JSON inválido
+no queda en el caché. `main_predictivo.py --no-cache` ignora lo guardado y
+lo refresca.
+"""
+import gzip
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+PROJECT_ROOT  = Path(__file__).resolve().parent
+RESPUESTAS_DIR = PROJECT_ROOT / "Predictivo" / ".respuestas"
+SUFFIX        = ".json.gz"
+DATE_FORMAT   = "%Y%m%d%H%M%S"
+TZ            = ZoneInfo("America/Bogota")
+
+# Caché de respuestas (1 = activo), vigencia de las ventanas de hoy (min) y tamaño máximo (MB)
+ENABLED = os.getenv("PREDICTIVO_RESPUESTAS", "1").strip() != "0"
+TTL_MINUTES = float(os.getenv("PREDICTIVO_RESPUESTAS_TTL_MIN", "10") or 0)
+MAX_MB = float(os.getenv("PREDICTIVO_RESPUESTAS_MAX_MB", "1000") or 1000)
+# Minutos después de medianoche en que la API todavía publica registros del día anterior
+PUBLISH_LAG_MINUTES = float(os.getenv("PREDICTIVO_RESPUESTAS_LAG_MIN", "15") or 0)
+# --no-cache: no se leen entradas guardadas (las respuestas nuevas sí se guardan)
+REFRESH = False
+
+READ_BYTES = 1 << 20
+# gzip rápido: el JSON de campaign_3 se comprime ~10x aun en el nivel 1 y no frena la descarga
+COMPRESS_LEVEL = 1
+
+_stats = {"hit": 0, "miss": 0, "bytes": 0}
+_stats_lock = threading.Lock()
+
+# ========================= Entradas =========================
+
+def entry_path(api: str, date_ini: str, date_end: str) -> Path:
+    return RESPUESTAS_DIR / f"{api}_{date_ini}_{date_end}{SUFFIX}"
+
+def is_final(date_end: str, downloaded: float) -> bool:
+    """
+    True si una respuesta de la ventana que termina en date_end, descargada
+    en el timestamp downloaded, ya no cambia: se bajó después del fin del
+    día de la ventana (Bogotá) más PUBLISH_LAG_MINUTES.
+    """
+    day = datetime.strptime(date_end, DATE_FORMAT).date()
+    day_end = datetime(day.year, day.month, day.day, tzinfo=TZ) + timedelta(days=1)
+    return datetime.fromtimestamp(downloaded, TZ) >= day_end + timedelta(minutes=PUBLISH_LAG_MINUTES)
+
+def entry_is_final(path: Path, mtime: float) -> bool:
+    try:
+        return is_final(path.name[:-len(SUFFIX)].rsplit("_", 1)[-1], mtime)
+    except ValueError:  # nombre que no es de este caché
+        return True
+
+def _expired(path: Path, mtime: float, now: float) -> bool:
+    return not entry_is_final(path, mtime) and now - mtime > TTL_MINUTES * 60
+
+def _count(kind: str, n_bytes: int = 0):
+    with _stats_lock:
+        _stats[kind] += 1
+        _stats["bytes"] += n_bytes
+
+def take_stats() -> dict:
+    """Hits / misses / bytes comprimidos desde la última llamada (y los reinicia)."""
+    with _stats_lock:
+        stats = dict(_stats)
+        _stats.update(hit=0, miss=0, bytes=0)
+    return stats
+
+def read_chunks(path: Path):
+    """Bloques de bytes descomprimidos de una entrada del caché."""
+    with gzip.open(path, "rb") as f:
+        while block := f.read(READ_BYTES):
+            yield block
+
+def _tee(chunks, f):
+    for chunk in chunks:
+        f.write(chunk)
+        yield chunk
+
+# ========================= Caché =========================
+
+def fetch(api: str, date_ini: str, date_end: str, open_stream, consume):
+    """
+    consume(bloques de bytes) sobre la respuesta guardada de (api, date_ini,
+    date_end) si hay una vigente; si no, sobre open_stream() (la llamada a
+    la API), guardando los bloques comprimidos a medida que pasan. La
+    entrada se confirma solo si consume termina sin error.
+    """
+    if not ENABLED:
+        return consume(open_stream())
+
+    path = entry_path(api, date_ini, date_end)
+    if not REFRESH:
+        try:
+            st = path.stat()
+            if not _expired(path, st.st_mtime, time.time()):
+                result = consume(read_chunks(path))
+                _count("hit", st.st_size)
+                return result
+        except FileNotFoundError:  # no existe, o la depuró otro proceso
+            pass
+        except (OSError, EOFError, zlib.error, ValueError) as e:
+            print(f"Caché de respuestas: {path.name} ilegible ({e}); se pide a la API")
+            path.unlink(missing_ok=True)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    stream = open_stream()
+    try:
+        with gzip.open(tmp, "wb", compresslevel=COMPRESS_LEVEL) as f:
+            result = consume(_tee(stream, f))
+    except BaseException:
+        if hasattr(stream, "close"):
+            stream.close()  # libera la conexión si consume no leyó la respuesta completa
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, path)
+    _count("miss", path.stat().st_size)
+    evict()
+    return result
+
+def evict(max_mb: float = None):
+    """Borra las respuestas no definitivas vencidas y luego las más viejas hasta quedar bajo max_mb."""
+    max_bytes = (MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    now = time.time()
+    for p in RESPUESTAS_DIR.glob("*.tmp"):  # descargas interrumpidas por una caída
+        try:
+            if now - p.stat().st_mtime > 3600:
+                p.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+    entries = []
+    for p in RESPUESTAS_DIR.glob(f"*{SUFFIX}"):
+        try:
+            st = p.stat()
+            if _expired(p, st.st_mtime, now):
+                p.unlink(missing_ok=True)
+                continue
+        except FileNotFoundError:  # otro proceso (backfill, poller) ya la depuró
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        total -= size
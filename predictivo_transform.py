@@ -0,0 +1,502 @@
+"""
+Kernels vectorizados compartidos por main_predictivo.py y predictivo_sabado.py.
+
+Cada función opera sobre una columna completa (pd.Series) y replica
+exactamente la lógica escalar de normalize_phone / clean_cedula_value
+(referencias en benchmark_predictivo.py) / parse_date_any que antes se
+aplicaba fila a fila con Series.apply. Los
+textos se pasan a una matriz NumPy de code points (una fila por registro) y
+todo el trabajo de prefijos, dígitos y espacios se hace con operaciones
+sobre esa matriz.
+
+Las columnas de baja cardinalidad (RESULT -> MENSAJE, constantes del CRM) se
+manejan como categóricas: la transformación se calcula una vez por valor
+distinto y se reparte a las filas por código.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_ORD_0     = ord("0")
+_ORD_9     = ord("9")
+_ORD_DOT   = ord(".")
+_ORD_SPACE = ord(" ")
+
+PHONE_LEN = 10
+
+# Los kernels de texto y de fechas convierten y procesan la columna por
+# bloques de filas (arreglo 'U', matriz de code points, to_datetime) para que
+# sus temporales no crezcan con el volumen del día
+KERNEL_BLOCK_ROWS = 65_536
+
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%d/%m/%Y %H:%M:%S",
+                "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%d/%m/%Y")
+DATE_SAMPLE_SIZE = 500
+
+# Por debajo de este número de filas el costo de levantar procesos no compensa
+PARALLEL_MIN_ROWS = 50_000
+
+# ========================= Helpers =========================
+
+def enable_copy_on_write():
+    """
+    Activa copy-on-write en pandas 2.x (en pandas >= 3 ya es el comportamiento
+    por defecto): los filtros y rename dejan de copiar datos hasta que se
+    modifica una columna.
+    """
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+def _to_unicode_array(s: pd.Series) -> tuple:
+    """
+    Convierte la columna a un arreglo NumPy 'U' (vacío para nulos) y retorna
+    (arreglo, máscara de nulos).
+    """
+    na = s.isna().to_numpy()
+    text = s.where(~na, "").astype(str)
+    arr = np.asarray(text.to_numpy(dtype=object), dtype="U")
+    if arr.dtype.itemsize == 0:
+        arr = arr.astype("U1")
+    return arr, na
+
+def _codepoints(arr: np.ndarray) -> np.ndarray:
+    """Vista (n, ancho) uint32 de un arreglo 'U' (copia editable)."""
+    width = arr.dtype.itemsize // 4
+    return arr.view(np.uint32).reshape(len(arr), width).copy()
+
+def _compact_left(codes: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    """Mueve a la izquierda (en orden) los code points marcados en keep; rellena con 0."""
+    order = np.argsort(~keep, axis=1, kind="stable")
+    return np.take_along_axis(np.where(keep, codes, 0), order, axis=1)
+
+def _row_blocks(n: int):
+    for start in range(0, n, KERNEL_BLOCK_ROWS):
+        yield slice(start, min(n, start + KERNEL_BLOCK_ROWS))
+
+def _concat_blocks(blocks: list, index: pd.Index) -> pd.Series:
+    """Une los bloques de un kernel con el índice de la columna original (sin armar un índice nuevo)."""
+    out = blocks[0] if len(blocks) == 1 else pd.concat(blocks, ignore_index=True)
+    return out.set_axis(index)
+
+# ========================= Teléfono =========================
+
+def _phone_block(arr: np.ndarray) -> tuple:
+    codes = _codepoints(arr)
+    is_digit = (codes >= _ORD_0) & (codes <= _ORD_9)
+    n_digits = is_digit.sum(axis=1)
+
+    # Dígitos compactados a la izquierda, con margen para prefijo + 10 dígitos.
+    # Después de n_digits quedan valores basura, pero solo se leen filas con
+    # exactamente prefijo + 10 dígitos.
+    pad = max(0, 3 + PHONE_LEN - codes.shape[1])
+    digits = (_compact_left(codes, is_digit) - _ORD_0).astype(np.int8)
+    if pad:
+        digits = np.pad(digits, ((0, 0), (0, pad)))
+
+    pref_957 = (n_digits >= 3) & (digits[:, 0] == 9) & (digits[:, 1] == 5) & (digits[:, 2] == 7)
+    pref_9   = (n_digits >= 1) & (digits[:, 0] == 9) & ~pref_957
+    offset = np.where(pref_957, 3, np.where(pref_9, 1, 0))
+
+    cols = offset[:, None] + np.arange(PHONE_LEN)
+    body = np.take_along_axis(digits, cols, axis=1).astype(np.int64)
+
+    valid = (n_digits - offset == PHONE_LEN) & (body[:, 0] == 3)
+    values = body @ (10 ** np.arange(PHONE_LEN - 1, -1, -1, dtype=np.int64))
+    return np.where(valid, values, 0), valid
+
+def normalize_phone_series(s: pd.Series) -> pd.Series:
+    """
+    Versión por columna de normalize_phone:
+    - deja solo dígitos
+    - quita prefijo 957 (o, si no, un 9 inicial)
+    - valida celular colombiano (10 dígitos iniciando en 3)
+    Retorna Int64 con <NA> para los teléfonos inválidos.
+    """
+    if s.empty:
+        return pd.Series(pd.array([], dtype="Int64"), index=s.index)
+
+    values = np.zeros(len(s), dtype=np.int64)
+    valid = np.zeros(len(s), dtype=bool)
+    for blk in _row_blocks(len(s)):
+        arr, na = _to_unicode_array(s.iloc[blk])
+        values[blk], valid[blk] = _phone_block(arr)
+        valid[blk] &= ~na
+
+    values[~valid] = 0
+    return pd.Series(pd.arrays.IntegerArray(values, ~valid), index=s.index)
+
+# ========================= Cédula =========================
+
+def _cedula_block(arr: np.ndarray) -> np.ndarray:
+    arr = np.char.strip(arr)
+    if arr.dtype.itemsize == 0:
+        arr = arr.astype("U1")
+    codes = _codepoints(arr)
+    lengths = np.char.str_len(arr)
+    rows = np.arange(len(arr))
+
+    # Quitar ".0" final
+    has_tail = lengths >= 2
+    last = np.where(has_tail, lengths - 1, 0)
+    ends_dot0 = has_tail & (codes[rows, last] == _ORD_0) & (codes[rows, np.maximum(last - 1, 0)] == _ORD_DOT)
+    codes[rows[ends_dot0], last[ends_dot0]] = 0
+    codes[rows[ends_dot0], last[ends_dot0] - 1] = 0
+
+    # Quitar espacios y volver a texto (NumPy descarta los 0 finales)
+    codes = _compact_left(codes, (codes != _ORD_SPACE) & (codes != 0))
+    return codes.astype(np.uint32, copy=False).view(arr.dtype).reshape(len(arr)).astype(object)
+
+def clean_cedula_series(s: pd.Series) -> pd.Series:
+    """
+    Versión por columna de clean_cedula_value: vacíos -> "", strip,
+    sin ".0" final y sin espacios internos.
+    """
+    if s.empty:
+        return pd.Series([], index=s.index, dtype=str)
+
+    # cada bloque pasa a str antes del siguiente: los objetos str de Python
+    # del bloque se liberan en vez de acumularse para la columna completa
+    blocks = [pd.Series(_cedula_block(_to_unicode_array(s.iloc[blk])[0]), dtype=str)
+              for blk in _row_blocks(len(s))]
+    return _concat_blocks(blocks, s.index)
+
+# ========================= Esquema compacto =========================
+
+# Identificadores que vuelven idénticos al pasar de int64 a texto
+# (sin ceros a la izquierda y dentro del rango de int64)
+_CANONICAL_ID = r"0|[1-9][0-9]{0,17}"
+
+def compact_id_series(s: pd.Series) -> pd.Series:
+    """
+    Representación compacta de identificadores ya limpios (clean_cedula_series):
+    - Int64 si todos los valores no vacíos son enteros canónicos ("" -> <NA>)
+    - si no, Categorical (texto codificado por diccionario)
+    En ambos casos to_csv escribe exactamente el texto original.
+    """
+    empty = s.eq("").to_numpy()
+    canonical = s.str.fullmatch(_CANONICAL_ID).fillna(False).to_numpy() | empty
+    if not canonical.all():
+        return s.astype("category")
+
+    values = np.zeros(len(s), dtype=np.int64)
+    for blk in _row_blocks(len(s)):
+        filled = ~empty[blk]
+        if filled.any():
+            values[blk][filled] = np.asarray(s.iloc[blk].to_numpy()[filled], dtype="U").astype(np.int64)
+    return pd.Series(pd.arrays.IntegerArray(values, empty), index=s.index)
+
+def id_as_text(s: pd.Series) -> pd.Series:
+    """Inverso de compact_id_series: texto con "" para los vacíos."""
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return s.astype("string").fillna("").astype(str)
+    return s.astype(str)
+
+# ========================= Fechas =========================
+
+def parse_date_any(s):
+    for fmt in DATE_FORMATS:
+        try:
+            return pd.to_datetime(s, format=fmt, errors="raise")
+        except Exception:
+            pass
+    return pd.to_datetime(s, errors="coerce")
+
+def rank_date_formats(s: pd.Series, sample_size: int = DATE_SAMPLE_SIZE) -> list:
+    """
+    Toma una muestra aleatoria de la columna y retorna los formatos de
+    DATE_FORMATS que reconocen algún valor, del que más reconoce al que menos.
+    """
+    values = s.dropna()
+    if values.empty:
+        return []
+    sample = values.sample(n=min(sample_size, len(values)), random_state=0)
+
+    hits = {}
+    for fmt in DATE_FORMATS:
+        hits[fmt] = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+        if hits[fmt] == len(sample):
+            break
+    return sorted((f for f in hits if hits[f]), key=lambda f: -hits[f])
+
+def parse_date_series(s: pd.Series) -> tuple:
+    """
+    Versión por columna de parse_date_any: ordena los formatos según una
+    muestra, convierte la columna con un to_datetime por formato (solo sobre
+    las filas que siguen pendientes, por bloques de KERNEL_BLOCK_ROWS) y usa parse_date_any únicamente para lo
+    que ningún formato reconoce. Retorna (fechas, filas_por_ruta_lenta).
+
+    Los formatos de DATE_FORMATS son excluyentes entre sí, así que el orden
+    de prueba no cambia el resultado respecto a parse_date_any.
+    """
+    parsed = np.full(len(s), np.datetime64("NaT"), dtype="datetime64[ns]")
+    pending = s.notna().to_numpy(copy=True)
+
+    for fmt in rank_date_formats(s):
+        idx = np.flatnonzero(pending)
+        if not len(idx):
+            break
+        for start in range(0, len(idx), KERNEL_BLOCK_ROWS):
+            sub = idx[start:start + KERNEL_BLOCK_ROWS]
+            chunk = pd.to_datetime(pd.Series(s.iloc[sub].to_numpy(dtype=object)), format=fmt, errors="coerce")
+            ok = chunk.notna().to_numpy()
+            parsed[sub[ok]] = chunk[ok].to_numpy()
+            pending[sub[ok]] = False
+
+    idx = np.flatnonzero(pending)
+    if len(idx):
+        slow = pd.Series([parse_date_any(v) for v in s.iloc[idx].to_numpy(dtype=object)], dtype="datetime64[ns]")
+        parsed[idx] = slow.to_numpy()
+    return pd.Series(parsed, index=s.index), len(idx)
+
+def format_date_series(dt: pd.Series, fmt: str) -> pd.Series:
+    """dt.dt.strftime(fmt) por bloques: el texto de cada bloque pasa a str antes del siguiente."""
+    if dt.empty:
+        return dt.dt.strftime(fmt)
+    return _concat_blocks([dt.iloc[blk].dt.strftime(fmt) for blk in _row_blocks(len(dt))], dt.index)
+
+# ========================= Categóricas =========================
+
+def map_unique(s: pd.Series, fn) -> pd.Series:
+    """
+    Aplica fn una sola vez por valor distinto de s y reparte el resultado a
+    todas las filas por código (Categorical). Pensado para columnas derivadas
+    de baja cardinalidad como MENSAJE a partir de RESULT.
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    derived = [fn(v) for v in uniques]
+    # Dos entradas pueden derivar en el mismo texto: las categorías deben ser únicas
+    remap, categories = pd.factorize(pd.Series(derived, dtype=object), use_na_sentinel=False)
+    return pd.Series(pd.Categorical.from_codes(remap[codes], categories), index=s.index)
+
+def constant_column(value, index: pd.Index) -> pd.Series:
+    """Columna con el mismo valor en todas las filas, como Categorical de un solo código."""
+    codes = np.zeros(len(index), dtype=np.int8)
+    return pd.Series(pd.Categorical.from_codes(codes, [value]), index=index)
+
+# ========================= Join Multicanal =========================
+
+def index_multicanal_map(tmp: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja el Multicanal map indexado por CEDULA (única) para resolver
+    NUMERO PRODUCTO con Index.get_indexer, sin merge. La tabla hash del
+    índice se construye una sola vez (en el primer lookup) y se reutiliza
+    en cada llamada: bloques del modo streaming, particiones de un worker.
+    - CEDULA compacta Int64 (sin nulos) -> índice int64; si no, índice de texto
+    - NUMERO PRODUCTO con el mismo esquema compacto que CEDULA: Int64 si todos
+      son enteros canónicos (casi siempre únicos, el diccionario no ahorra);
+      si no, categórico con "" entre las categorías para los faltantes
+    """
+    cedula = tmp["CEDULA"]
+    if pd.api.types.is_integer_dtype(cedula.dtype) and not cedula.hasnans:
+        keys = pd.Index(cedula.to_numpy(dtype=np.int64), name="CEDULA")
+    else:
+        keys = pd.Index(id_as_text(cedula).to_numpy(dtype=object), dtype=str, name="CEDULA")
+
+    producto = tmp["NUMERO PRODUCTO"]
+    if not isinstance(producto.dtype, pd.CategoricalDtype) and not pd.api.types.is_integer_dtype(producto.dtype):
+        producto = compact_id_series(producto)
+    if isinstance(producto.dtype, pd.CategoricalDtype) and "" not in producto.cat.categories:
+        producto = producto.cat.add_categories("")
+    return pd.DataFrame({"NUMERO PRODUCTO": producto.array}, index=keys)
+
+def lookup_numero_producto(cedula: pd.Series, multicanal_map: pd.DataFrame) -> pd.Series:
+    """
+    NUMERO PRODUCTO (Int64 o Categorical, según el map) para cada CEDULA;
+    vacío si no está en el Multicanal. multicanal_map viene de index_multicanal_map (CEDULA única en
+    el índice, última aparición del archivo), así que basta un get_indexer
+    vectorizado y tomar los códigos del producto.
+    """
+    keys = multicanal_map.index
+    if pd.api.types.is_integer_dtype(keys.dtype) and pd.api.types.is_integer_dtype(cedula.dtype):
+        # Las cédulas son >= 0: -1 nunca coincide y sirve para los <NA>
+        target = cedula.to_numpy(dtype=np.int64, na_value=-1)
+    else:
+        # Ruta de texto (alguna cédula no canónica en uno de los dos lados)
+        if pd.api.types.is_integer_dtype(keys.dtype):
+            keys = pd.Index(id_as_text(keys.to_series()).to_numpy(dtype=object), dtype=str)
+        target = id_as_text(cedula).to_numpy(dtype=object)
+
+    pos = keys.get_indexer(target)
+    found = pos >= 0
+    producto = multicanal_map["NUMERO PRODUCTO"].array
+
+    if pd.api.types.is_integer_dtype(producto.dtype):
+        values = np.zeros(len(pos), dtype=np.int64)
+        missing = np.ones(len(pos), dtype=bool)
+        values[found] = producto.to_numpy(dtype=np.int64, na_value=0)[pos[found]]
+        missing[found] = producto.isna()[pos[found]]
+        return pd.Series(pd.arrays.IntegerArray(values, missing), index=cedula.index)
+
+    empty_code = producto.categories.get_loc("")
+    codes = np.full(len(pos), empty_code, dtype=producto.codes.dtype)
+    codes[found] = producto.codes[pos[found]]
+    return pd.Series(pd.Categorical.from_codes(codes, producto.categories), index=cedula.index)
+
+# ========================= Finalización salida =========================
+
+def read_template_columns(path: Path) -> list:
+    df_hdr = pd.read_csv(path, nrows=0, sep=";", dtype=str, engine="python")
+    cols = [(c.strip() if isinstance(c, str) else c) for c in df_hdr.columns]
+    cols = [c for c in cols if c and not str(c).lower().startswith("unnamed")]
+    return cols
+
+@lru_cache(maxsize=8)
+def _template_columns_cached(path: str, mtime: float) -> tuple:
+    return tuple(read_template_columns(Path(path)))
+
+def resolve_output_columns(template_path: Path, default_cols: list) -> list:
+    """
+    Orden final de columnas: el del template (leído una sola vez mientras el
+    archivo no cambie) y, al final, las de default_cols que falten.
+    """
+    tpl_cols = []
+    if template_path.exists():
+        tpl_cols = list(_template_columns_cached(str(template_path), template_path.stat().st_mtime))
+    final_cols = tpl_cols if tpl_cols else list(default_cols)
+
+    for col in default_cols:
+        if col not in final_cols:
+            final_cols.append(col)
+    return [c for c in final_cols if c and not str(c).lower().startswith("unnamed")]
+
+def _strip_value(v):
+    return v.strip() if isinstance(v, str) else v
+
+def finalize_output(columns: dict, index: pd.Index, final_cols: list, trimmed=()) -> pd.DataFrame:
+    """
+    Arma el DataFrame de salida directamente en el orden final_cols.
+    - columnas que no vienen en columns -> "" (categórica)
+    - strip vectorizado solo en columnas de texto que no estén en trimmed
+      (las categóricas se limpian sobre sus categorías)
+    - nulos -> "" (los enteros nullable se dejan con <NA>: to_csv los
+      escribe vacíos y el texto solo se genera al escribir)
+    """
+    data = {}
+    for col in final_cols:
+        s = columns.get(col)
+        if s is None:
+            data[col] = constant_column("", index)
+            continue
+
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.map(_strip_value)
+        elif col not in trimmed and (pd.api.types.is_string_dtype(s.dtype) or s.dtype == object):
+            stripped = s.str.strip()
+            s = stripped.where(stripped.notna(), s)
+
+        if s.hasnans and not pd.api.types.is_integer_dtype(s.dtype):
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                if "" not in s.cat.categories:
+                    s = s.cat.add_categories("")
+            else:
+                s = s.astype(object)
+            s = s.fillna("")
+        data[col] = s
+
+    return pd.DataFrame(data, index=index, copy=False)
+
+# ========================= Compactación de intentos =========================
+
+def compact_attempts(out: pd.DataFrame, keys: list, mensaje_rank: dict) -> tuple:
+    """
+    Deja una sola fila (la gestión más reciente) por llave de keys sobre la
+    salida final del cargue:
+    - más reciente = mayor FECHA GESTION (sin fecha cuenta como la más vieja)
+    - empate de fecha: gana el MENSAJE con menor valor en mensaje_rank
+      (llaves en mayúscula; los no listados pierden contra todos)
+    - empate total: gana el último intento en el orden de la fuente
+    Las filas con CEDULA vacía no se pliegan. Se conserva el orden original.
+    Retorna (salida compactada, filas plegadas).
+    """
+    if out.empty:
+        return out, 0
+
+    fecha = pd.to_datetime(out["FECHA GESTION"].astype(str), format="%d/%m/%Y %H:%M:%S", errors="coerce")
+    codes, uniques = pd.factorize(out["MENSAJE"], use_na_sentinel=False)
+    worst = len(mensaje_rank)
+    rank = np.array([mensaje_rank.get(str(v).upper(), worst) for v in uniques], dtype=np.int64)[codes]
+
+    order = pd.DataFrame({k: out[k].to_numpy() for k in keys})
+    order["_fecha"] = fecha.to_numpy()
+    order["_rank"] = -rank
+    order = order[out["CEDULA"].astype("string").fillna("").ne("").to_numpy()]
+    order = order.sort_values(["_fecha", "_rank"], na_position="first", kind="stable")
+
+    folded = order.index[order.duplicated(subset=keys, keep="last")]
+    if not len(folded):
+        return out, 0
+    keep = np.ones(len(out), dtype=bool)
+    keep[folded] = False
+    return out[keep], len(folded)
+
+# ========================= Transform paralelo =========================
+
+# Estado por proceso worker: se llena una sola vez en el initializer, así el
+# Multicanal map viaja una vez por worker y no una vez por partición.
+_WORKER_STATE = {}
+
+def _init_worker(build_fn, template_path: Path, multicanal_map: pd.DataFrame):
+    _WORKER_STATE["build_fn"] = build_fn
+    _WORKER_STATE["template_path"] = template_path
+    _WORKER_STATE["multicanal_map"] = multicanal_map
+
+def _build_partition(part: pd.DataFrame) -> pd.DataFrame:
+    return _WORKER_STATE["build_fn"](
+        part, _WORKER_STATE["template_path"], _WORKER_STATE["multicanal_map"], verbose=False
+    )
+
+def parallel_build_cargue(build_fn, df: pd.DataFrame, template_path: Path,
+                          multicanal_map: pd.DataFrame, workers: int) -> pd.DataFrame:
+    """
+    Ejecuta build_fn (build_cargue_from_df de main_predictivo o
+    predictivo_sabado; debe ser una función de módulo o un partial de una)
+    sobre particiones contiguas de df en un ProcessPoolExecutor y concatena
+    los resultados en el orden original de las filas. Con pocos datos o
+    workers <= 1 corre en serie.
+    """
+    if workers <= 1 or len(df) < PARALLEL_MIN_ROWS:
+        return build_fn(df, template_path, multicanal_map)
+
+    t0 = time.perf_counter()
+    bounds = np.linspace(0, len(df), workers + 1, dtype=int)
+    parts = [df.iloc[a:b] for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(build_fn, template_path, multicanal_map)) as pool:
+        outs = list(pool.map(_build_partition, parts))
+
+    out = pd.concat(outs)
+    print(f"Transform paralelo: {len(parts)} partición(es) en {workers} proceso(s): "
+          f"{time.perf_counter() - t0:.3f} s")
+    return out
+
+# ========================= Tiempos por etapa =========================
+
+def timed(timings: dict, stage: str, fn, *args):
+    """Ejecuta fn(*args) y suma su duración en timings[stage] (segundos)."""
+    t0 = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - t0
+
+def print_stage_timings(timings: dict, total: float, overlapped: tuple = (), overlap_wall: float = 0.0):
+    """
+    Resumen de tiempos por etapa. Las etapas de overlapped corrieron en
+    paralelo durante overlap_wall segundos de reloj: si no compiten por CPU
+    (p.ej. la espera de red del fetch), la suma de sus duraciones menos ese
+    tiempo es el reloj ahorrado.
+    """
+    print("Tiempos por etapa:")
+    for stage, secs in timings.items():
+        mark = " (en paralelo)" if stage in overlapped else ""
+        print(f"  {stage:<24} {secs:8.3f} s{mark}")
+    if overlapped:
+        suma = sum(timings.get(s, 0.0) for s in overlapped)
+        print(f"  {' + '.join(overlapped)}: {overlap_wall:.3f} s de reloj "
+              f"(suma de etapas {suma:.3f} s, ahorro {suma - overlap_wall:.3f} s)")
+    print(f"  {'total (reloj)':<24} {total:8.3f} s")
@@ -0,0 +1,210 @@
+"""
+Validación del cargue predictivo antes de subirlo al CRM.
+
+Revisa cada CSV de cargue contra el header de formatoArbolProducto.csv y
+contra reglas por columna:
+- NUMERO TELEFONO: celular colombiano de 10 dígitos que inicia en 3
+- FECHA GESTION: "%d/%m/%Y %H:%M:%S" y fecha/hora válidas
+- CEDULA: no vacía (advertencia: el transform conserva las filas sin cédula
+  a propósito, así que se reportan pero no bloquean el cargue)
+
+Un archivo vacío o ilegible (sin header, CSV mal formado, no UTF-8) se
+reporta como fallido con la regla "lectura" en vez de detener RPA_Cargue.
+
+Las reglas de forma se evalúan sobre la matriz de code points de la columna
+(una comparación NumPy por posición del patrón), sin regex fila a fila.
+Por cada archivo se escribe un reporte JSON en Logs/validacion/. RPA_Cargue
+valida antes de abrir el navegador y no sube los archivos que fallan.
+
+Uso:
+    python predictivo_validacion.py                       # archivos de Predictivo/ y Predictivo/lotes/
+    python predictivo_validacion.py Predictivo/lotes/cargue_predictivo_2026-10-16_lote_001.csv
+"""
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from predictivo_transform import read_template_columns
+
+PROJECT_ROOT   = Path(__file__).resolve().parent
+TEMPLATE_PATH  = PROJECT_ROOT / "formatoArbolProducto.csv"
+PREDICTIVO_DIR = PROJECT_ROOT / "Predictivo"
+LOTES_DIR      = PREDICTIVO_DIR / "lotes"
+REPORTES_DIR   = PROJECT_ROOT / "Logs" / "validacion"
+
+# Patrones de forma: "D" = dígito, cualquier otro carácter debe coincidir literal
+PHONE_PATTERN = "3DDDDDDDDD"
+FECHA_PATTERN = "DD/DD/DDDD DD:DD:DD"
+FECHA_FORMAT  = "%d/%m/%Y %H:%M:%S"
+
+MAX_EJEMPLOS = 10  # filas de ejemplo por regla en el reporte
+
+# ========================= Reglas =========================
+
+def _codepoints(values: pd.Series, width: int) -> tuple:
+    """Matriz (n, width) uint32 de code points (0 = relleno) y largo de cada texto."""
+    arr = np.asarray(values.to_numpy(dtype=object), dtype=f"U{max(width, 1)}")
+    lengths = np.char.str_len(arr)
+    codes = arr.view(np.uint32).reshape(len(arr), max(width, 1))
+    return codes, lengths
+
+def pattern_mask(values: pd.Series, pattern: str) -> np.ndarray:
+    """True donde el texto tiene exactamente la forma de pattern ("D" = dígito)."""
+    if values.empty:
+        return np.zeros(0, dtype=bool)
+    width = len(pattern)
+    # textos más largos que el patrón se truncan al convertir: el largo los descarta
+    too_long = values.str.len().to_numpy() > width
+    codes, lengths = _codepoints(values, width)
+    ok = (lengths == width) & ~too_long
+    for pos, ch in enumerate(pattern):
+        col = codes[:, pos]
+        ok &= ((col >= ord("0")) & (col <= ord("9"))) if ch == "D" else (col == ord(ch))
+    return ok
+
+def _digits(codes: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Entero formado por los dígitos codes[:, start:stop] (ya validados como dígitos)."""
+    out = np.zeros(len(codes), dtype=np.int64)
+    for pos in range(start, stop):
+        out = out * 10 + (codes[:, pos].astype(np.int64) - ord("0"))
+    return out
+
+def _fecha_valida(values: pd.Series) -> np.ndarray:
+    ok = pattern_mask(values, FECHA_PATTERN)
+    if not ok.any():
+        return ok
+    # la forma no garantiza el calendario (31/02, 25:00...): rangos sobre los dígitos
+    codes, _ = _codepoints(values[ok], len(FECHA_PATTERN))
+    day, month, year = _digits(codes, 0, 2), _digits(codes, 3, 5), _digits(codes, 6, 10)
+    hour, minute, second = _digits(codes, 11, 13), _digits(codes, 14, 16), _digits(codes, 17, 19)
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    valid_month = (month >= 1) & (month <= 12)
+    max_day = month_days[np.where(valid_month, month, 0)] + ((month == 2) & leap)
+    valid = (valid_month & (day >= 1) & (day <= max_day) & (year >= 1)
+             & (hour <= 23) & (minute <= 59) & (second <= 59))
+    ok[np.flatnonzero(ok)[~valid]] = False
+    return ok
+
+RULES = [
+    # (regla, columna, función -> máscara de filas válidas)
+    ("telefono_10_digitos", "NUMERO TELEFONO", lambda s: pattern_mask(s, PHONE_PATTERN)),
+    ("fecha_formato", "FECHA GESTION", _fecha_valida),
+]
+
+# Reglas que se reportan en "advertencias" sin marcar el archivo como fallido
+WARNING_RULES = [
+    ("cedula_no_vacia", "CEDULA", lambda s: s.str.strip().ne("").to_numpy()),
+]
+
+READ_ERRORS = (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError)
+
+# ========================= Validación =========================
+
+def _check_rules(df: pd.DataFrame, rules: list, skip_missing: bool) -> list:
+    """Hallazgos de rules sobre df; skip_missing omite las columnas ausentes ya reportadas por el header."""
+    hallazgos = []
+    for regla, col, fn in rules:
+        if col not in df.columns:
+            if not skip_missing:
+                hallazgos.append({"regla": regla, "columna": col, "detalle": "columna ausente"})
+            continue
+        bad = np.flatnonzero(~fn(df[col]))
+        if len(bad):
+            hallazgos.append({
+                "regla": regla,
+                "columna": col,
+                "filas_invalidas": int(len(bad)),
+                # número de línea en el archivo (header = línea 1)
+                "ejemplos": [{"linea": int(i) + 2, "valor": df[col].iat[i]} for i in bad[:MAX_EJEMPLOS]],
+            })
+    return hallazgos
+
+def validate_cargue_file(path: Path, template_path: Path = TEMPLATE_PATH) -> dict:
+    """Valida un CSV de cargue (sep=';') y retorna el reporte (dict serializable a JSON)."""
+    t0 = time.perf_counter()
+    path = Path(path)
+    report = {
+        "archivo": str(path),
+        "validado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "filas": 0,
+        "ok": False,
+        "errores": [],
+        "advertencias": [],
+    }
+    all_rules = RULES + WARNING_RULES
+    try:
+        raw_header = list(pd.read_csv(path, sep=";", nrows=0, encoding="utf-8").columns)
+        header = [c.strip() for c in raw_header]
+        # solo se leen las columnas que tienen reglas
+        rule_cols = [raw for raw, c in zip(raw_header, header) if c in {col for _, col, _ in all_rules}]
+        df = pd.read_csv(path, sep=";", dtype=str, keep_default_na=False, encoding="utf-8", usecols=rule_cols)
+    except READ_ERRORS as e:
+        report["errores"].append({"regla": "lectura", "detalle": f"{type(e).__name__}: {e}"})
+        report["segundos"] = round(time.perf_counter() - t0, 3)
+        return report
+    df.columns = [c.strip() for c in df.columns]
+    errores = report["errores"]
+
+    expected = read_template_columns(template_path) if template_path.exists() else []
+    if expected and header[:len(expected)] != expected:
+        missing = [c for c in expected if c not in header]
+        errores.append({
+            "regla": "header_template",
+            "detalle": "faltan columnas del template" if missing else "orden de columnas distinto al template",
+            "esperado": expected,
+            "encontrado": header,
+            "faltantes": missing,
+        })
+
+    header_failed = bool(errores)
+    errores.extend(_check_rules(df, RULES, header_failed))
+    report["advertencias"] = _check_rules(df, WARNING_RULES, header_failed)
+    report.update(filas=int(len(df)), ok=not errores, segundos=round(time.perf_counter() - t0, 3))
+    return report
+
+def write_report(report: dict, reportes_dir: Path = REPORTES_DIR) -> Path:
+    reportes_dir.mkdir(parents=True, exist_ok=True)
+    dest = reportes_dir / f"{Path(report['archivo']).stem}.json"
+    dest.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return dest
+
+def validate_files(paths: list, template_path: Path = TEMPLATE_PATH) -> list:
+    """Valida y reporta cada archivo; retorna los reportes en el mismo orden."""
+    reports = []
+    for path in paths:
+        report = validate_cargue_file(path, template_path)
+        dest = write_report(report)
+        estado = "OK" if report["ok"] else f"FALLA ({', '.join(e['regla'] for e in report['errores'])})"
+        if report["advertencias"]:
+            estado += f"; advertencias: {', '.join(e['regla'] for e in report['advertencias'])}"
+        print(f"Validación {Path(path).name}: {estado} [{report['filas']} filas, "
+              f"{report['segundos']:.3f} s] -> {dest}")
+        reports.append(report)
+    return reports
+
+def cargue_files() -> list:
+    """CSV de cargue pendientes: los lotes si existen, si no los cargue_*.csv de Predictivo/."""
+    lotes = sorted(LOTES_DIR.glob("*.csv")) if LOTES_DIR.exists() else []
+    if lotes:
+        return lotes
+    return sorted(PREDICTIVO_DIR.glob("cargue_*.csv")) if PREDICTIVO_DIR.exists() else []
+
+# ========================= CLI =========================
+
+def main():
+    paths = [Path(p) for p in sys.argv[1:]] or cargue_files()
+    if not paths:
+        print("No hay archivos de cargue para validar.")
+        return 0
+    reports = validate_files(paths)
+    return 0 if all(r["ok"] for r in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
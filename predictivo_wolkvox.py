@@ -0,0 +1,184 @@
+"""
+Fetch de campaign_3 por ventanas de tiempo concurrentes.
+
+Una sola llamada a reports_manager.php con el día completo tarda minutos y,
+si falla o se pasa del timeout, aborta toda la cadena. El rango se parte en
+sub-ventanas (WOLKVOX_SHARD_MINUTES, p.ej. 60 = una por hora) que se piden
+en paralelo sobre una requests.Session con pool de conexiones; cada ventana
+se reintenta por separado con backoff exponencial. Los resultados se unen
+en el orden de las ventanas y se deduplican por conn_id (una llamada que cae
+en el borde de dos ventanas llega una sola vez al cargue); main_predictivo
+los deja después en el orden canónico (date, conn_id) de sort_frame.
+
+Solo se reintentan fallas transitorias: conexión / timeout, HTTP 429 y 5xx,
+y respuestas cortadas o con JSON inválido. Un 4xx (token, servidor) falla
+de una vez. Si una ventana agota sus intentos el fetch falla completo: un
+cargue con horas faltantes no se distingue de uno correcto.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from predictivo_transform import parse_date_series
+
+# Minutos por sub-ventana (0 = el rango completo en una sola llamada)
+SHARD_MINUTES = int(os.getenv("WOLKVOX_SHARD_MINUTES", "60") or 0)
+# Ventanas pedidas en paralelo (tamaño del pool de conexiones)
+SHARD_WORKERS = int(os.getenv("WOLKVOX_SHARD_WORKERS", "4") or 1)
+# Intentos por ventana y espera base del backoff (s): base, 2*base, 4*base...
+SHARD_RETRIES = int(os.getenv("WOLKVOX_RETRIES", "3") or 1)
+BACKOFF_S     = float(os.getenv("WOLKVOX_BACKOFF_S", "2") or 0)
+# Timeout por llamada (s): conexión y lectura entre bloques
+TIMEOUT_S     = float(os.getenv("WOLKVOX_TIMEOUT_S", "120") or 120)
+
+DATE_FORMAT = "%Y%m%d%H%M%S"
+
+# ========================= Ventanas =========================
+
+def shard_windows(date_ini: str, date_end: str, minutes: int = SHARD_MINUTES) -> list:
+    """
+    Parte [date_ini, date_end] (YYYYMMDDHHMMSS, ambos inclusive como en la
+    API) en ventanas consecutivas de minutes que no se solapan:
+    00:00:00-00:59:59, 01:00:00-01:59:59, ...
+    """
+    if minutes <= 0:
+        return [(date_ini, date_end)]
+    start = datetime.strptime(date_ini, DATE_FORMAT)
+    end = datetime.strptime(date_end, DATE_FORMAT)
+    step = timedelta(minutes=minutes)
+    windows = []
+    while start <= end:
+        stop = min(start + step - timedelta(seconds=1), end)
+        windows.append((start.strftime(DATE_FORMAT), stop.strftime(DATE_FORMAT)))
+        start += step
+    return windows
+
+# ========================= HTTP =========================
+
+def make_session(pool_size: int = SHARD_WORKERS) -> requests.Session:
+    """Session con un pool de pool_size conexiones al host de Wolkvox (keep-alive entre ventanas)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, requests.HTTPError):
+        status = exc.response.status_code if exc.response is not None else 0
+        return status == 429 or status >= 500
+    # conexión, timeout, cuerpo cortado (ChunkedEncodingError) o JSON inválido
+    return isinstance(exc, (requests.RequestException, ValueError))
+
+def with_retries(fn, label: str, retries: int = None, backoff_s: float = None):
+    """
+    fn() con hasta retries intentos (por defecto WOLKVOX_RETRIES); entre
+    intentos espera backoff_s * 2^(intento-1) (por defecto WOLKVOX_BACKOFF_S).
+    """
+    retries = SHARD_RETRIES if retries is None else retries
+    backoff_s = BACKOFF_S if backoff_s is None else backoff_s
+    for intento in range(1, retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if intento == retries or not is_retryable(e):
+                raise
+            wait = backoff_s * 2 ** (intento - 1)
+            print(f"[WARN] campaign_3 {label}: intento {intento}/{retries} falló "
+                  f"({type(e).__name__}: {e}); reintento en {wait:.1f} s")
+            time.sleep(wait)
+
+def fetch_windows(fetch_window, windows: list, workers: int = SHARD_WORKERS) -> list:
+    """
+    fetch_window(*ventana, session) para cada ventana, con reintentos y
+    hasta workers en paralelo. Cada ventana es (date_ini, date_end) o
+    (date_ini, date_end, campaign_id). Retorna los resultados en el orden
+    de windows.
+    """
+    workers = max(1, min(workers, len(windows)))
+    with make_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(with_retries, lambda w=w: fetch_window(*w, session), "-".join(w))
+            for w in windows
+        ]
+        return [f.result() for f in futures]
+
+# ========================= Unión =========================
+
+def merge_frames(frames: list) -> pd.DataFrame:
+    """
+    Une los DataFrames de cada ventana (de campaign_frame) y quita los
+    conn_id repetidos (gana la primera aparición; los registros sin conn_id
+    se conservan). attrs: payload_fp de las respuestas en orden, leidos y
+    conservados sumados, "duplicados" descartados y la unión de "campanas".
+    """
+    non_empty = [f for f in frames if len(f)] or frames[:1]
+    df = pd.concat(non_empty, ignore_index=True) if len(non_empty) > 1 else non_empty[0]
+    n_dup = 0
+    if "conn_id" in df.columns:
+        dup = df["conn_id"].notna() & df.duplicated("conn_id")
+        n_dup = int(dup.sum())
+        if n_dup:
+            df = df[~dup].reset_index(drop=True)
+
+    fps = [f.attrs["payload_fp"] for f in frames]
+    df.attrs = {
+        "payload_fp": fps[0] if len(fps) == 1 else hashlib.sha256("".join(fps).encode()).hexdigest(),
+        "leidos": sum(f.attrs["leidos"] for f in frames),
+        "conservados": len(df),
+        "duplicados": n_dup,
+        "campanas": sorted({tuple(p) for f in frames for p in f.attrs.get("campanas", ())}),
+    }
+    return df
+
+def merge_records(batches: list) -> list:
+    """Lo mismo que merge_frames para listas de dicts (respuesta de resp.json())."""
+    seen = set()
+    merged = []
+    for records in batches:
+        for rec in records:
+            conn_id = rec.get("conn_id") if isinstance(rec, dict) else None
+            if conn_id is not None:
+                if conn_id in seen:
+                    continue
+                seen.add(conn_id)
+            merged.append(rec)
+    return merged
+
+def canonical_order(dates: pd.Series, conn_ids: pd.Series) -> np.ndarray:
+    """
+    Posiciones del orden canónico de los registros de campaign_3: por date y,
+    en el mismo segundo, por conn_id (numérico si lo es, si no como texto);
+    los empates quedan como llegaron (orden estable). No se depende del orden
+    en que responde la API: no está documentado y cambia entre campaign_id=all
+    y una llamada por campaña.
+    """
+    when = parse_date_series(dates.reset_index(drop=True))[0].astype("int64")
+    conn_num = pd.to_numeric(conn_ids, errors="coerce").to_numpy(dtype=float)
+    # sin conn_id: texto vacío (en pandas 3 astype(str) deja el NaN y lexsort no compara str con float)
+    conn_str = conn_ids.fillna("").astype(str).to_numpy(dtype=object)
+    # lexsort ordena por la última llave primero; stable por defecto
+    return np.lexsort((np.arange(len(when)), conn_str, conn_num, when))
+
+def sort_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Filas en el orden canónico (canonical_order), con los mismos attrs."""
+    if len(df) < 2 or "date" not in df.columns or "conn_id" not in df.columns:
+        return df
+    attrs = dict(df.attrs)
+    df = df.iloc[canonical_order(df["date"], df["conn_id"])].reset_index(drop=True)
+    df.attrs = attrs
+    return df
+
+def sort_records(records: list) -> list:
+    """Lo mismo que sort_frame para listas de dicts."""
+    if len(records) < 2:
+        return records
+    get = lambda key: pd.Series([r.get(key) if isinstance(r, dict) else None for r in records], dtype=object)
+    return [records[i] for i in canonical_order(get("date"), get("conn_id"))]
@@ -0,0 +1,18 @@
+@echo off
+REM ============================================================
+REM  run_ingesta.bat – Poller de campaign_3 (ingesta incremental)
+REM  Activa el entorno virtual y pide la ventana nueva cada
+REM  PREDICTIVO_POLL_MIN minutos hasta PREDICTIVO_POLL_HASTA
+REM ============================================================
+
+REM Ir a la carpeta del proyecto
+cd /d "%~dp0"
+
+REM Activar el entorno virtual
+call venv\Scripts\activate.bat
+
+REM Refrescar el mapa opt1 -> campaign_id si venció (los polls no lo reaprenden)
+python predictivo_campanas.py
+
+REM Ejecutar el poller
+python predictivo_ingesta.py poll